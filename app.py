@@ -1,11 +1,16 @@
 from flask import Flask, render_template, session, redirect, url_for
+from config import Config
+from models import find_summaries
 from services.db import get_db, close_db, SECRET_KEY
+from services import assets, batch, colleges, images, importer, indexes, keys, metrics, page_cache, similar
 import os
 
 
 def create_app():
     app = Flask(__name__, template_folder='templates', static_folder='static')
 
+    app.config.from_object(Config)
+
     # Set secret key
     app.config['SECRET_KEY'] = SECRET_KEY
 
@@ -24,13 +29,38 @@ def create_app():
     app.register_blueprint(admin_bp, url_prefix='/admin')
     app.register_blueprint(college_bp, url_prefix='/college')
 
+    # Request timing and MongoDB command metrics (before anything opens the client)
+    metrics.init_app(app)
+
+    # Indexes (startup bootstrap + CLI commands)
+    indexes.init_app(app)
+
+    # Batch recommendation precomputation (CLI commands)
+    batch.init_app(app)
+
+    # Bulk college import (CLI command)
+    importer.init_app(app)
+
+    # Normalized course/city match keys (backfill CLI command)
+    keys.init_app(app)
+
+    # Similar-colleges neighbour table (CLI commands)
+    similar.init_app(app)
+
+    # College write events (optional change stream so every worker invalidates)
+    colleges.init_app(app)
+
+    # Fingerprinted static assets (template helper, /assets route, CLI command)
+    assets.init_app(app)
+
+    # Image variants (template helper + CLI command)
+    images.init_app(app)
+
     # Main Pages
     @app.route('/')
     def home():
         db = get_db()
-        colleges = list(db.colleges.find().limit(6))
-        for college in colleges:
-            college['_id'] = str(college['_id'])
+        colleges = find_summaries(db.colleges, {}, limit=6)
         return render_template('home.html', colleges=colleges)
 
     @app.route('/about')
@@ -52,6 +82,9 @@ def create_app():
             return redirect(url_for('college.list_colleges'))
         return redirect(url_for('auth.login'))
 
+    # Cache rendered public pages (must run after all views are registered)
+    page_cache.init_app(app)
+
     # Teardown DB
     @app.teardown_appcontext
     def teardown_db(exception):
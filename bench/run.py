@@ -0,0 +1,177 @@
+"""Benchmark the listing, search and recommendation hot paths.
+
+Usage::
+
+    python -m bench.run --scale 1k --backend mongomock
+    python -m bench.run --scale 10k --backend mongod --uri mongodb://localhost:27017/studyway_bench
+
+The mongod backend DROPS the collections of the database in --uri, so point
+it at a scratch database. The mongomock backend (``pip install mongomock``)
+runs fully in memory. It does not support $text, so the search case is
+reported as skipped there. Use mongod for representative numbers.
+
+Each case runs through Flask's test client (or a direct call) and reports
+p50/p95/mean latency in milliseconds and ops/sec as JSON, tagged with the
+current git commit so results from different commits can be compared.
+"""
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+import time
+
+from bench.synthetic import SCALES, seed
+
+
+def _percentile(samples, pct):
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, int(round(pct / 100.0 * len(ordered))) - 1))
+    return ordered[index]
+
+
+def _summarize(samples):
+    total = sum(samples)
+    return {
+        'runs': len(samples),
+        'p50_ms': round(_percentile(samples, 50) * 1000, 3),
+        'p95_ms': round(_percentile(samples, 95) * 1000, 3),
+        'mean_ms': round(statistics.fmean(samples) * 1000, 3),
+        'ops_per_sec': round(len(samples) / total, 2) if total else None,
+    }
+
+
+def _git_commit():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _use_backend(backend, uri):
+    """Point services.db at the benchmark database and return it."""
+    from services import db as db_module
+
+    db_module.MONGO_URI = uri
+    if backend == 'mongomock':
+        import mongomock
+
+        client = mongomock.MongoClient(uri)
+        db_module._new_client = lambda: client
+    db_module.shutdown_client()
+    return db_module.get_client().get_default_database()
+
+
+def _login(client, user_id, role):
+    with client.session_transaction() as sess:
+        sess['user_id'] = str(user_id)
+        sess['role'] = role
+
+
+def build_cases(app, db, data):
+    from services.page_cache import page_cache
+    from services.recommender import engine, recommend_colleges
+
+    student_user = data['users'][0]
+    admin_user = data['users'][-1]
+    student = data['students'][0]
+    sample_college = data['colleges'][len(data['colleges']) // 2]
+    all_colleges = list(db.colleges.find({}))
+
+    anon = app.test_client()
+    student_client = app.test_client()
+    _login(student_client, student_user['_id'], 'user')
+    admin_client = app.test_client()
+    _login(admin_client, admin_user['_id'], 'admin')
+
+    def get(client, url, cold_page_cache=False, cold_engine=False):
+        def run():
+            if cold_page_cache:
+                page_cache.invalidate()  # measure rendering, not the page cache
+            if cold_engine:
+                engine.invalidate()  # measure the snapshot rebuild, not the result cache
+            response = client.get(url)
+            if response.status_code != 200:
+                raise RuntimeError('%s -> %s' % (url, response.status_code))
+        return run
+
+    filters = '?city=%s&state=%s&exam=%s&rating=5&fee=0-2000000' % (
+        sample_college['city'], sample_college['state'], sample_college['exam'])
+    return {
+        'college.list_colleges': get(anon, '/college/colleges', cold_page_cache=True),
+        'college.list_colleges[filters]': get(anon, '/college/colleges' + filters, cold_page_cache=True),
+        'college.list_colleges[search]': get(anon, '/college/colleges?search=engineering', cold_page_cache=True),
+        'college.list_colleges[cached]': get(anon, '/college/colleges'),
+        'user.recommendations': get(student_client, '/user/recommendations'),
+        'user.recommendations[cold]': get(student_client, '/user/recommendations', cold_engine=True),
+        'services.recommender.recommend_colleges': lambda: recommend_colleges(student, all_colleges),
+        'user.profile': get(student_client, '/user/profile'),
+        'admin.dashboard': get(admin_client, '/admin/dashboard'),
+    }
+
+
+def run_case(fn, repeat, warmup):
+    for _ in range(warmup):
+        fn()
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - started)
+    return _summarize(samples)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--scale', choices=sorted(SCALES), default='1k')
+    parser.add_argument('--backend', choices=['mongomock', 'mongod'], default='mongomock')
+    parser.add_argument('--uri', default='mongodb://localhost:27017/studyway_bench')
+    parser.add_argument('--repeat', type=int, default=50)
+    parser.add_argument('--warmup', type=int, default=3)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--only', action='append', help='Run only cases whose name contains this text.')
+    parser.add_argument('--output', help='Write the JSON report here instead of stdout.')
+    args = parser.parse_args(argv)
+
+    db = _use_backend(args.backend, args.uri)
+    data = seed(db, SCALES[args.scale], seed=args.seed)
+
+    from app import create_app
+    from services.indexes import ensure_indexes
+
+    app = create_app()
+    app.config['TESTING'] = True
+    with app.app_context():
+        try:
+            ensure_indexes(db)
+        except NotImplementedError:
+            pass  # mongomock cannot build every index type
+
+    results = {}
+    for name, fn in build_cases(app, db, data).items():
+        if args.only and not any(part in name for part in args.only):
+            continue
+        try:
+            results[name] = run_case(fn, args.repeat, args.warmup)
+        except Exception as exc:  # report and keep going with the other cases
+            results[name] = {'skipped': '%s: %s' % (type(exc).__name__, exc)}
+        print('%-45s %s' % (name, results[name]), file=sys.stderr)
+
+    report = {
+        'commit': _git_commit(),
+        'backend': args.backend,
+        'scale': args.scale,
+        'seed': args.seed,
+        'repeat': args.repeat,
+        'results': results,
+    }
+    output = json.dumps(report, indent=2, sort_keys=True)
+    if args.output:
+        with open(args.output, 'w') as fh:
+            fh.write(output + '\n')
+    else:
+        print(output)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,119 @@
+"""Seeded synthetic data for benchmarks.
+
+generate(scale, seed) always yields the same users, students, colleges and
+courses for the same arguments, so runs on different commits compare like
+with like. That includes the ObjectIds, which keyset pagination orders by.
+"""
+import random
+
+from bson import ObjectId
+from werkzeug.security import generate_password_hash
+
+from services.keys import college_keys, student_keys
+
+SCALES = {'1k': 1000, '10k': 10000, '100k': 100000}
+
+CITIES = [
+    ('Mumbai', 'Maharashtra'), ('Pune', 'Maharashtra'), ('Nagpur', 'Maharashtra'),
+    ('Delhi', 'Delhi'), ('New Delhi', 'Delhi'), ('Bengaluru', 'Karnataka'), ('Mysuru', 'Karnataka'),
+    ('Chennai', 'Tamil Nadu'), ('Coimbatore', 'Tamil Nadu'), ('Hyderabad', 'Telangana'),
+    ('Kolkata', 'West Bengal'), ('Ahmedabad', 'Gujarat'), ('Gandhinagar', 'Gujarat'),
+    ('Jaipur', 'Rajasthan'), ('Lucknow', 'Uttar Pradesh'), ('Varanasi', 'Uttar Pradesh'),
+    ('Bhopal', 'Madhya Pradesh'), ('Indore', 'Madhya Pradesh'), ('Patna', 'Bihar'),
+    ('Bhubaneswar', 'Odisha'), ('Guwahati', 'Assam'), ('Kochi', 'Kerala'),
+    ('Thiruvananthapuram', 'Kerala'), ('Chandigarh', 'Chandigarh'), ('Dehradun', 'Uttarakhand'),
+    ('Raipur', 'Chhattisgarh'), ('Ranchi', 'Jharkhand'), ('Srinagar', 'Jammu and Kashmir'),
+]
+COURSES = ['B.Tech', 'M.Tech', 'BCA', 'MCA', 'MBA', 'BBA', 'B.Com', 'M.Com', 'B.Sc', 'M.Sc',
+           'MBBS', 'BDS', 'B.Pharm', 'LLB', 'BA', 'MA', 'B.Arch', 'B.Des', 'PhD', 'B.Ed']
+FACILITIES = ['Hostel', 'Library', 'Wi-Fi', 'Sports Complex', 'Cafeteria', 'Labs', 'Gym',
+              'Auditorium', 'Medical Centre', 'Transport']
+EXAMS = ['JEE Main', 'JEE Advanced', 'NEET', 'CAT', 'GATE', 'CLAT', 'CUET', 'MAT', 'XAT']
+WORDS = ['Institute', 'University', 'College', 'Technology', 'Science', 'Management', 'National',
+         'Global', 'Royal', 'Modern', 'Engineering', 'Arts', 'Commerce', 'Medical', 'Law']
+
+# Timestamp of the first generated ObjectId; later documents get later seconds,
+# so _id order matches generation order as it would with real inserts.
+ID_EPOCH = 1700000000
+
+# One shared hash: hashing a password per user would dominate seeding time.
+PASSWORD_HASH = generate_password_hash('benchmark')
+
+
+def _object_id(rng, i):
+    """A reproducible ObjectId: timestamp ID_EPOCH + i, then 8 seeded random bytes."""
+    return ObjectId('%08x%016x' % (ID_EPOCH + i, rng.getrandbits(64)))
+
+
+def make_college(rng, i):
+    """The i-th college document (with its match keys) drawn from ``rng``."""
+    city, state = rng.choice(CITIES)
+    name = '%s %s %s %d' % (city, rng.choice(WORDS), rng.choice(WORDS), i)
+    college = {
+        '_id': _object_id(rng, i),
+        'college_name': name,
+        'city': city,
+        'state': state,
+        'college_website': 'https://college%d.example.in' % i,
+        'ranking': rng.randint(1, 1000),
+        'avg_fee': float(rng.randrange(20000, 2500000, 5000)),
+        'placement_rating': round(rng.uniform(1, 10), 1),
+        'exam': rng.choice(EXAMS),
+        'cutoff': str(round(rng.uniform(5, 9.5), 1)),
+        'description': ' '.join(rng.choice(WORDS).lower() for _ in range(60)),
+        'facilities': rng.sample(FACILITIES, rng.randint(2, 6)),
+        'courses': rng.sample(COURSES, rng.randint(2, 6)),
+        'image': None,
+    }
+    college.update(college_keys(college))
+    return college
+
+
+def make_user_and_student(rng, i):
+    """The i-th student user and their profile document drawn from ``rng``."""
+    user_id = _object_id(rng, i)
+    first, last = 'Student%d' % i, rng.choice(WORDS)
+    user = {'_id': user_id, 'email': 'student%d@example.in' % i, 'password': PASSWORD_HASH,
+            'role': 'user', 'first_name': first, 'last_name': last}
+    student = {
+        'user_id': str(user_id),
+        'first_name': first,
+        'last_name': last,
+        'academic_profile': {
+            'tenth_percent': str(rng.randint(60, 99)),
+            'twelfth_percent': str(rng.randint(60, 99)),
+            'graduation_cgpa': str(round(rng.uniform(5, 10), 1)),
+            'entrance_score': str(rng.randint(50, 300)),
+        },
+        'location_pref': rng.choice(CITIES)[0] if rng.random() < 0.7 else '',
+        'budget': float(rng.randrange(100000, 3000000, 50000)),
+        'desired_course': rng.choice(COURSES),
+    }
+    student.update(student_keys(student))
+    return user, student
+
+
+def generate(scale, seed=42):
+    """Return {collection: [docs]} with ``scale`` colleges, users and students."""
+    rng = random.Random(seed)
+    colleges = [make_college(rng, i) for i in range(scale)]
+    courses = [{'course_name': course, 'college_id': college['_id']}
+               for college in colleges for course in college['courses']]
+    users, students = [], []
+    for i in range(scale):
+        user, student = make_user_and_student(rng, i)
+        users.append(user)
+        students.append(student)
+    users.append({'_id': _object_id(rng, scale), 'email': 'admin@example.in', 'password': PASSWORD_HASH,
+                  'role': 'admin', 'name': 'Admin'})
+    return {'colleges': colleges, 'courses': courses, 'users': users, 'students': students}
+
+
+def seed(db, scale, seed=42, batch_size=5000):
+    """Drop and refill the benchmark collections; returns the generated data."""
+    data = generate(scale, seed)
+    for name, docs in data.items():
+        db[name].drop()
+        for start in range(0, len(docs), batch_size):
+            db[name].insert_many(docs[start:start + batch_size], ordered=False)
+    return data
@@ -1,51 +1,85 @@
-import os
-from math import ceil
-
 from bson import ObjectId
-from flask import Blueprint, render_template, request, redirect, url_for, flash, current_app
-from werkzeug.utils import secure_filename
+from flask import Blueprint, render_template, request, redirect, url_for, flash, jsonify, Response, abort, stream_with_context
 
 from blueprints.college.routes import allowed_file
-from services.db import get_db
+from models import CollegeDetail
+from services import metrics
+from services.colleges import college_repository
+from services.db import get_db, pool_stats
+from services.export import EXPORT_FIELDS, FORMATS, export_rows
+from services.images import save_upload
+from services.pagination import paginate
+from services.page_cache import page_cache
+from services.recommender import engine
+from services.stats import dashboard_stats
 from utils.auth import login_required, role_required
 
 admin_bp = Blueprint('admin', __name__, template_folder='templates')
 
+USERS_PER_PAGE = 25
+
 @admin_bp.route('/dashboard')
 @login_required
 @role_required('admin')
 def dashboard():
-    db = get_db()
-    stats = {
-        'user_count': db.users.count_documents({}),
-        'college_count': db.colleges.count_documents({})
-    }
+    stats = dashboard_stats.get(get_db())
     return render_template('admin/dashboard.html', stats=stats)
 
+@admin_bp.route('/cache-stats')
+@login_required
+@role_required('admin')
+def cache_stats():
+    return jsonify({
+        'recommendations': engine.cache.stats(),
+        'pages': page_cache.stats()
+    })
+
+@admin_bp.route('/metrics')
+@login_required
+@role_required('admin')
+def metrics_view():
+    pool = pool_stats()
+    recommendations = engine.cache.stats()
+    pages = page_cache.stats()
+    gauges = {
+        'studyway_mongo_pool_open_connections': ('Open pooled MongoDB connections.', pool['open_connections']),
+        'studyway_mongo_pool_in_use': ('Pooled MongoDB connections checked out.', pool['in_use']),
+    }
+    counters = {
+        'studyway_mongo_pool_checkout_failures_total': ('Failed pool checkouts.', pool['checkout_failures']),
+        'studyway_recommendation_cache_hits_total': ('Recommendation cache hits.', recommendations['hits']),
+        'studyway_recommendation_cache_misses_total': ('Recommendation cache misses.', recommendations['misses']),
+        'studyway_page_cache_hits_total': ('Rendered-page cache hits.', pages['hits']),
+        'studyway_page_cache_misses_total': ('Rendered-page cache misses.', pages['misses']),
+        'studyway_page_cache_not_modified_total': ('Rendered-page cache 304 responses.', pages['not_modified']),
+    }
+    return Response(metrics.render(gauges, counters), mimetype='text/plain; version=0.0.4')
+
+@admin_bp.route('/export/<collection>.<fmt>')
+@login_required
+@role_required('admin')
+def export(collection, fmt):
+    if collection not in EXPORT_FIELDS or fmt not in FORMATS:
+        abort(404)
+    db = get_db()
+    response = Response(stream_with_context(export_rows(db, collection, fmt)), mimetype=FORMATS[fmt])
+    response.headers['Content-Disposition'] = f'attachment; filename="{collection}.{fmt}"'
+    response.headers['X-Accel-Buffering'] = 'no'  # let nginx pass chunks straight through
+    return response
+
 @admin_bp.route('/colleges')
 @login_required
 @role_required('admin')
 def list_colleges():
     db = get_db()
-    page = int(request.args.get('page', 1))  # current page
     per_page = 10
-
-    total_count = db.colleges.count_documents({})
-    total_pages = ceil(total_count / per_page)
-
-    items = list(
-        db.colleges.find({})
-        .skip((page - 1) * per_page)
-        .limit(per_page)
-    )
+    page = paginate(db.colleges, {}, per_page, token=request.args.get('cursor'))
 
     return render_template(
         'admin/colleges_list.html',
-        items=items,
-        page=page,
-        total_pages=total_pages
+        items=page.items,
+        page=page
     )
-UPLOAD_FOLDER = 'static/image'   # path inside your project
 @admin_bp.route('/colleges/create', methods=['GET', 'POST'])
 @login_required
 @role_required('admin')
@@ -56,10 +90,7 @@ def create_college():
         image_filename = None
 
         if image_file and image_file.filename != '' and allowed_file(image_file.filename):
-            filename = secure_filename(image_file.filename)
-            image_path = os.path.join(current_app.root_path, UPLOAD_FOLDER, filename)
-            image_file.save(image_path)
-            image_filename = filename
+            image_filename = save_upload(image_file) or image_filename
 
         courses_list = [c.strip() for c in request.form.get('courses', '').split(',') if c.strip()]
         facilities_list = [f.strip() for f in request.form.get('facilities', '').split(',') if f.strip()]
@@ -80,16 +111,8 @@ def create_college():
             'courses': courses_list,  # store course names here
             'image': image_filename
         }
-        result = db.colleges.insert_one(college_doc)
-        college_id = result.inserted_id
-
-        # Insert courses in courses collection with college_id
-        for course_name in courses_list:
-            if not db.courses.find_one({'course_name': course_name, 'college_id': college_id}):
-                db.courses.insert_one({
-                    'course_name': course_name,
-                    'college_id': college_id
-                })
+        # Also fills the `courses` collection and refreshes derived college data
+        college_repository.create(db, college_doc)
 
         flash('College added with courses.', 'success')
         return redirect(url_for('admin.list_colleges'))
@@ -111,22 +134,11 @@ def edit_college(id):
         image_filename = item.get('image')
 
         if image_file and image_file.filename != '' and allowed_file(image_file.filename):
-            filename = secure_filename(image_file.filename)
-            image_path = os.path.join(current_app.root_path, UPLOAD_FOLDER, filename)
-            image_file.save(image_path)
-            image_filename = filename
+            image_filename = save_upload(image_file) or image_filename
 
         courses_list = [c.strip() for c in request.form.get('courses', '').split(',') if c.strip()]
         facilities_list = [f.strip() for f in request.form.get('facilities', '').split(',') if f.strip()]
 
-        # Insert new courses in courses collection with college_id if not exists
-        for course_name in courses_list:
-            if not db.courses.find_one({'course_name': course_name, 'college_id': ObjectId(id)}):
-                db.courses.insert_one({
-                    'course_name': course_name,
-                    'college_id': ObjectId(id)
-                })
-
         update = {
             'college_name': request.form.get('college_name'),
             'city': request.form.get('city'),
@@ -142,18 +154,18 @@ def edit_college(id):
             'courses': courses_list,  # update course names
             'image': image_filename
         }
-        db.colleges.update_one({'_id': ObjectId(id)}, {'$set': update})
+        college_repository.update(db, item, update)
         flash('College updated with courses.', 'success')
         return redirect(url_for('admin.list_colleges'))
 
-    return render_template('admin/college_form.html', item=item)
+    return render_template('admin/college_form.html', item=CollegeDetail(item))
 
 @admin_bp.route('/colleges/<id>/delete', methods=['POST'])
 @login_required
 @role_required('admin')
 def delete_college(id):
     db = get_db()
-    db.colleges.delete_one({'_id': ObjectId(id)})
+    college_repository.delete(db, ObjectId(id))
     flash('College deleted.', 'info')
     return redirect(url_for('admin.list_colleges'))
 
@@ -162,5 +174,5 @@ def delete_college(id):
 @role_required('admin')
 def user_list():
     db = get_db()
-    users = list(db.users.find({}))
-    return render_template('admin/users_list.html', users=users)
\ No newline at end of file
+    page = paginate(db.users, {}, USERS_PER_PAGE, token=request.args.get('cursor'))
+    return render_template('admin/users_list.html', users=page.items, page=page)
\ No newline at end of file
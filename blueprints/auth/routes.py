@@ -1,11 +1,23 @@
 from flask import Blueprint, render_template, request, redirect, url_for, flash, session
 from werkzeug.security import generate_password_hash, check_password_hash
 from bson import ObjectId
+from pymongo.errors import DuplicateKeyError
+from services.colleges import college_repository
 from services.db import get_db
+from services.keys import student_keys
+from services.stats import dashboard_stats
 
 auth_bp = Blueprint("auth", __name__, url_prefix="/auth")
 
 
+# The unique users.email index rejects a registration that raced past the
+# find_one check below.
+@auth_bp.errorhandler(DuplicateKeyError)
+def duplicate_email(e):
+    flash("Email already registered!", "danger")
+    return redirect(url_for("auth.register"))
+
+
 # ------------------- REGISTER -------------------
 @auth_bp.route("/register", methods=["GET", "POST"])
 def register():
@@ -36,7 +48,7 @@ def register():
             }).inserted_id
 
             # Insert into students collection
-            db.students.insert_one({
+            student_doc = {
                 "user_id": str(user_id),
                 "first_name": first_name,
                 "last_name": last_name,
@@ -44,7 +56,11 @@ def register():
                 "location_pref": "",
                 "budget": None,
                 "desired_course": ""
-            })
+            }
+            student_doc.update(student_keys(student_doc))
+            db.students.insert_one(student_doc)
+            dashboard_stats.incr('users')
+            dashboard_stats.incr('students')
 
         elif role == "college":
             # College registration
@@ -63,13 +79,15 @@ def register():
             }).inserted_id
 
             # Insert into colleges collection
-            db.colleges.insert_one({
+            college_doc = {
                 "user_id": str(user_id),
                 "college_name": college_name,
                 "location": location,
                 "exam_accepted": exam_accepted,
                 "courses": courses_list
-            })
+            }
+            college_repository.create(db, college_doc)
+            dashboard_stats.incr('users')
 
         flash("Registration successful! Please login.", "success")
         return redirect(url_for("auth.login"))
@@ -1,7 +1,15 @@
-import os
-from flask import Blueprint, render_template, request, redirect, url_for, flash, session, current_app
-from werkzeug.utils import secure_filename
+from bson import ObjectId
+from flask import Blueprint, render_template, request, redirect, url_for, flash, session, abort
+from models import SUMMARY_PROJECTION, CollegeDetail, CollegeSummary
+from services.colleges import college_repository
 from services.db import get_db
+from services.executor import query_executor
+from services.facets import facets
+from services.geo import RADIUS_CHOICES_KM, city_names, geocode, within_filter
+from services.images import save_upload
+from services.pagination import paginate
+from services.search import search_filter
+from services.similar import similar_colleges
 from utils.auth import login_required, role_required
 
 college_bp = Blueprint('college', __name__, template_folder='templates')
@@ -32,11 +40,6 @@ def profile():
         # Get courses from form
         courses_list = [c.strip() for c in (request.form.get('courses') or '').split(',') if c.strip()]
 
-        # Insert each course into `courses` collection if not already exists
-        for course_name in courses_list:
-            if not db.courses.find_one({'course_name': course_name}):
-                db.courses.insert_one({'course_name': course_name})
-
         # Prepare update dictionary
         update = {
             'college_name': request.form.get('college_name'),
@@ -57,21 +60,21 @@ def profile():
         if 'image' in request.files:
             file = request.files['image']
             if file and allowed_file(file.filename):
-                filename = secure_filename(file.filename)
-                upload_path = os.path.join(current_app.root_path, 'static', 'image', filename)
-                file.save(upload_path)
-                update['image'] = filename
+                filename = save_upload(file)
+                if filename:
+                    update['image'] = filename
 
-        # Update or insert college document
+        # Update or insert college document (the repository keeps the `courses`
+        # collection and derived college data in sync)
         if college_doc.get('_id'):
-            db.colleges.update_one({'college_name': name}, {'$set': update})
+            college_repository.update(db, college_doc, update)
         else:
-            db.colleges.insert_one(update)
+            college_repository.create(db, update)
 
         flash('College profile saved successfully.', 'success')
         return redirect(url_for('college.dashboard'))
 
-    return render_template('college/profile.html', item=college_doc)
+    return render_template('college/profile.html', item=CollegeDetail(college_doc))
 
 
 @college_bp.route('/colleges')
@@ -85,24 +88,20 @@ def list_colleges():
     rating = request.args.get('rating', type=float)
     fee_range = request.args.get('fee', '').strip()
     exam = request.args.get('exam', '').strip()
+    near = request.args.get('near', '').strip()
+    within = request.args.get('within', '').strip()
+    within_km = request.args.get('within', type=int)
 
-    query = {}
-
-    # Search
-    if search_query:
-        query['$or'] = [
-            {'college_name': {'$regex': search_query, '$options': 'i'}},
-            {'courses': {'$regex': search_query, '$options': 'i'}},
-            {'name': {'$regex': search_query, '$options': 'i'}}
-        ]
+    # Search (text index, ranked by relevance)
+    query = search_filter(search_query)
 
-    # Filters
+    # Filters (values come from the facet dropdowns, so match them exactly)
     if city:
-        query['city'] = {'$regex': city, '$options': 'i'}
+        query['city'] = city
     if state:
-        query['state'] = {'$regex': state, '$options': 'i'}
+        query['state'] = state
     if exam:
-        query['exam'] = {'$regex': exam, '$options': 'i'}
+        query['exam'] = exam
 
     if rating:
         query['placement_rating'] = {'$gte': rating}
@@ -112,28 +111,37 @@ def list_colleges():
             query['avg_fee'] = {'$gte': min_fee, '$lte': max_fee}
         except ValueError:
             pass
+    # "Within N km of <city>" (2dsphere index on geo); only the offered radii
+    if within:
+        center = geocode(near) if near else None
+        if within_km not in RADIUS_CHOICES_KM:
+            flash('Distance must be one of %s km; showing colleges at any distance.'
+                  % ', '.join(map(str, RADIUS_CHOICES_KM)), 'warning')
+        elif not near:
+            flash('Enter a city to filter by distance; showing colleges at any distance.', 'warning')
+        elif not center:
+            flash('Unknown city "%s"; showing colleges at any distance.' % near, 'warning')
+        else:
+            query.update(within_filter(center, within_km))
 
-    # --- Pagination ---
-    page = int(request.args.get("page", 1))  # current page
+    # --- Pagination (keyset cursor) ---
+    # Page, count and filter facets (a rebuild when expired) are fetched concurrently.
     per_page = 9
-    skip = (page - 1) * per_page
-
-    total_colleges = db.colleges.count_documents(query)
-    total_pages = (total_colleges + per_page - 1) // per_page
-
-    colleges = list(
-        db.colleges.find(query).skip(skip).limit(per_page)
-    )
-
-    # Fetch unique states, cities, exams, ratings
-    cities = db.colleges.distinct("city")
-    states = db.colleges.distinct("state")
-    exams = db.colleges.distinct("exam")
-    ratings = db.colleges.distinct("placement_rating")
-
-    # remove page from args to avoid duplicate errors
+    page, facet_counts = query_executor.gather(
+        lambda: paginate(db.colleges, query, per_page, token=request.args.get('cursor'),
+                         projection=SUMMARY_PROJECTION),
+        lambda: facets.all_counts(db))
+    colleges = CollegeSummary.from_docs(page.items)
+
+    # Filter values with per-value college counts, served from the facet index
+    cities = [value for value, _ in facet_counts['city']]
+    states = [value for value, _ in facet_counts['state']]
+    exams = [value for value, _ in facet_counts['exam']]
+    ratings = [value for value, _ in facet_counts['placement_rating']]
+
+    # remove cursor from args to avoid duplicate errors
     request_args = request.args.to_dict(flat=True)
-    request_args.pop("page", None)
+    request_args.pop("cursor", None)
 
     return render_template(
         'college/college_list.html',
@@ -142,7 +150,22 @@ def list_colleges():
         cities=cities,
         exams=exams,
         ratings=ratings,
+        near_cities=city_names(),
+        radius_choices=RADIUS_CHOICES_KM,
+        facet_counts={field: dict(items) for field, items in facet_counts.items()},
         page=page,
-        total_pages=total_pages,
         request_args=request_args
     )
+
+
+@college_bp.route('/colleges/<id>/similar')
+def similar(id):
+    db = get_db()
+    if not ObjectId.is_valid(id):
+        abort(404)
+    college = db.colleges.find_one({'_id': ObjectId(id)}, SUMMARY_PROJECTION)
+    if not college:
+        abort(404)
+    # Neighbours come from the precomputed table (flask build-similar)
+    neighbours = CollegeSummary.from_docs(similar_colleges(db, college['_id']))
+    return render_template('college/similar.html', college=CollegeSummary(college), colleges=neighbours)
@@ -1,9 +1,19 @@
-from flask import Blueprint, render_template, request, flash, redirect, url_for, session
+from flask import Blueprint, render_template, request, flash, redirect, url_for, session, jsonify
 
-from blueprints.admin.routes import admin_bp
+from blueprints.admin.routes import admin_bp, USERS_PER_PAGE
+from models import CollegeSummary
+from services.batch import load_precomputed
+from services.catalog import catalog
 from services.db import get_db
+from services.geo import geocode
+from services.identity import current_student, current_user, invalidate as invalidate_identity
+from services.keys import student_keys
+from services.pagination import paginate
+from services.recommender import engine, DEFAULT_IMAGE, NEARBY_KM
+from services.stats import dashboard_stats
 from utils.auth import login_required, role_required
 from bson import ObjectId
+from pymongo.errors import DuplicateKeyError
 
 # ✅ Blueprint for user module
 user_bp = Blueprint('user', __name__, template_folder='templates')
@@ -21,26 +31,14 @@ def dashboard():
 def profile():
     db = get_db()
     user_id = session.get('user_id')  # Get user_id from session
-    user = db.users.find_one({'_id': ObjectId(user_id)}) if user_id else None
+    user = current_user()
 
     if not user:
         flash('User not found. Please login again.', 'danger')
         return redirect(url_for('auth.login'))
 
-    # Fetch all courses from courses collection
-    # Fetch unique course names from courses collection
-    # Fetch and normalize unique courses
-    courses_cursor = db.courses.find({}, {"courses": 1, "_id": 0})
-    all_courses = []
-
-    for doc in courses_cursor:
-        if "courses" in doc:
-            # Split by comma, strip spaces
-            items = [c.strip() for c in doc["courses"].split(",")]
-            all_courses.extend(items)
-
-    # Deduplicate and sort
-    unique_courses = sorted(set(all_courses))
+    # Course dropdown, served from the in-memory catalog
+    unique_courses = catalog.courses(db)
 
     if request.method == 'POST':
         academic_profile = {
@@ -55,7 +53,6 @@ def profile():
         desired_course = request.form.get('desired_course')
 
         # Insert or update in students collection only
-        student_doc = db.students.find_one({'user_id': user_id})
         student_data = {
             'user_id': user_id,
             'first_name': user['first_name'],
@@ -65,10 +62,11 @@ def profile():
             'budget': budget,
             'desired_course': desired_course
         }
-        if student_doc:
-            db.students.update_one({'user_id': user_id}, {'$set': student_data})
-        else:
-            db.students.insert_one(student_data)
+        student_data.update(student_keys(student_data))
+        result = db.students.update_one({'user_id': user_id}, {'$set': student_data}, upsert=True)
+        if result.upserted_id is not None:
+            dashboard_stats.incr('students')
+        invalidate_identity(user_id)
 
         flash('Student profile saved successfully!', 'success')
         return redirect(url_for('user.profile'))
@@ -76,13 +74,16 @@ def profile():
     return render_template("user/profile.html", user=user, courses=unique_courses)
 
 
+@user_bp.route('/courses.json')
+def course_catalog():
+    return jsonify(courses=catalog.courses(get_db()))
+
+
 @user_bp.route('/edit-profile', methods=['GET', 'POST'])
 @login_required
 @role_required('user')
 def edit_profile():
-    db = get_db()
-    user_id = session.get('user_id')  # Use user_id instead of email
-    user = db.users.find_one({'_id': ObjectId(user_id)}) if user_id else None
+    user = current_user()
 
     if not user:
         flash('User not found. Please login again.', 'danger')
@@ -104,61 +105,31 @@ def recommendations():
         flash("Please login again.", "danger")
         return redirect(url_for("auth.login"))
 
-    student = db.students.find_one({'user_id': user_id})
+    student = current_student()
     if not student:
         return "Student profile not found!", 404
 
-    colleges = list(db.colleges.find({}))
-    recommended = []
-
-    for college in colleges:
-        score = 0
-
-        # Desired course match
-        if student.get('desired_course') and college.get('courses'):
-            if student['desired_course'].lower() in [c.lower() for c in college['courses']]:
-                score += 3
-
-        # Location match
-        if student.get('location_pref') and college.get('city'):
-            if student['location_pref'].lower() in college['city'].lower():
-                score += 2
-
-        # Budget match
-        if student.get('budget') and college.get('avg_fee'):
-            if student['budget'] >= college['avg_fee']:
-                score += 1
-
-        # Academic profile match
-        if student.get('academic_profile'):
-            grad_cgpa = student['academic_profile'].get('graduation_cgpa', 0)
-            if college.get('cutoff') and grad_cgpa >= college['cutoff']:
-                score += 2
-
-        if score > 0:
-            # Set default image if not present
-            if not college.get('image'):
-                college['image'] = 'default_college.jpg'  # make sure this file exists in static/image/
-            # Generate URL for template
-            college['image_url'] = url_for('static', filename=f'image/{college["image"]}')
-            recommended.append((college, score))
-
-    # Fallback: only desired course
-    if not recommended and student.get('desired_course'):
-        for college in colleges:
-            if student['desired_course'].lower() in [c.lower() for c in college.get('courses', [])]:
-                if not college.get('image'):
-                    college['image'] = 'default_college.jpg'
-                college['image_url'] = url_for('static', filename=f'image/{college["image"]}')
-                recommended.append((college, 3))
-
-    # Sort by score descending
-    recommended.sort(key=lambda x: x[1], reverse=True)
-    recommended_colleges = [col[0] for col in recommended]
+    # Precomputed by the batch job when available; otherwise score live.
+    recommended = load_precomputed(db, student)
+    if recommended is None:
+        recommended = engine.recommend(db, student)
+
+    recommended_colleges = CollegeSummary.from_docs(recommended)
+
+    # Closest other colleges around the student's city, from the in-memory snapshot
+    center = student.get('geo') or geocode(student.get('location_pref'))
+    nearby = []
+    if center:
+        exclude = [college._id for college in recommended_colleges]
+        nearby = CollegeSummary.from_docs(engine.nearby(db, center, NEARBY_KM, exclude=exclude))
+
+    for college in recommended_colleges + nearby:
+        college.image = college.image or DEFAULT_IMAGE
 
     return render_template(
         'user/recommendations.html',
         recommendations=recommended_colleges,
+        nearby=nearby,
         student=student
     )
 @admin_bp.route('/users')
@@ -166,8 +137,8 @@ def recommendations():
 @role_required('admin')
 def list_users():
     db = get_db()
-    users = list(db.users.find({}))
-    return render_template('admin/users_list.html', users=users)
+    page = paginate(db.users, {}, USERS_PER_PAGE, token=request.args.get('cursor'))
+    return render_template('admin/users_list.html', users=page.items, page=page)
 
 @admin_bp.route('/users/create', methods=['GET','POST'])
 @login_required
@@ -175,12 +146,17 @@ def list_users():
 def create_user():
     db = get_db()
     if request.method == 'POST':
-        db.users.insert_one({
-            'name': request.form['name'],
-            'email': request.form['email'],
-            'password': request.form['password'],
-            'role': request.form['role']
-        })
+        try:
+            db.users.insert_one({
+                'name': request.form['name'],
+                'email': request.form['email'],
+                'password': request.form['password'],
+                'role': request.form['role']
+            })
+        except DuplicateKeyError:
+            flash("Email already registered!", "danger")
+            return render_template('admin/user_form.html', user=None)
+        dashboard_stats.incr('users')
         flash("User added.", "success")
         return redirect(url_for('admin.list_users'))
     return render_template('admin/user_form.html', user=None)
@@ -192,11 +168,16 @@ def edit_user(id):
     db = get_db()
     user = db.users.find_one({'_id': ObjectId(id)})
     if request.method == 'POST':
-        db.users.update_one({'_id': ObjectId(id)}, {'$set': {
-            'name': request.form['name'],
-            'email': request.form['email'],
-            'role': request.form['role']
-        }})
+        try:
+            db.users.update_one({'_id': ObjectId(id)}, {'$set': {
+                'name': request.form['name'],
+                'email': request.form['email'],
+                'role': request.form['role']
+            }})
+        except DuplicateKeyError:
+            flash("Email already registered!", "danger")
+            return render_template('admin/user_form.html', user=user)
+        invalidate_identity(id)
         flash("User updated.", "success")
         return redirect(url_for('admin.list_users'))
     return render_template('admin/user_form.html', user=user)
@@ -206,6 +187,8 @@ def edit_user(id):
 @role_required('admin')
 def delete_user(id):
     db = get_db()
-    db.users.delete_one({'_id': ObjectId(id)})
+    if db.users.delete_one({'_id': ObjectId(id)}).deleted_count:
+        dashboard_stats.incr('users', -1)
+    invalidate_identity(id)
     flash("User deleted.", "info")
     return redirect(url_for('admin.list_users'))
\ No newline at end of file
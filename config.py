@@ -6,3 +6,54 @@ load_dotenv()
 class Config:
     SECRET_KEY = os.getenv("SECRET_KEY", "dev-key")
     MONGO_URI = os.getenv("MONGO_URI", "mongodb://localhost:27017/studyway")
+
+    # MongoClient connection pool (one shared client per worker process)
+    MONGO_MAX_POOL_SIZE = int(os.getenv("MONGO_MAX_POOL_SIZE", 50))
+    MONGO_MIN_POOL_SIZE = int(os.getenv("MONGO_MIN_POOL_SIZE", 0))
+    MONGO_MAX_IDLE_TIME_MS = int(os.getenv("MONGO_MAX_IDLE_TIME_MS", 60000))
+    MONGO_WAIT_QUEUE_TIMEOUT_MS = int(os.getenv("MONGO_WAIT_QUEUE_TIMEOUT_MS", 5000))
+    MONGO_CONNECT_TIMEOUT_MS = int(os.getenv("MONGO_CONNECT_TIMEOUT_MS", 5000))
+    MONGO_SOCKET_TIMEOUT_MS = int(os.getenv("MONGO_SOCKET_TIMEOUT_MS", 20000))
+    MONGO_SERVER_SELECTION_TIMEOUT_MS = int(os.getenv("MONGO_SERVER_SELECTION_TIMEOUT_MS", 5000))
+    MONGO_READ_PREFERENCE = os.getenv("MONGO_READ_PREFERENCE", "primary")
+
+    # Recommendation engine: college snapshot lifetime and per-profile result cache
+    RECOMMENDER_SNAPSHOT_TTL = int(os.getenv("RECOMMENDER_SNAPSHOT_TTL", 300))
+    RECOMMENDATION_CACHE_SIZE = int(os.getenv("RECOMMENDATION_CACHE_SIZE", 1024))
+    RECOMMENDATION_CACHE_TTL = int(os.getenv("RECOMMENDATION_CACHE_TTL", 600))
+
+    # Seconds before the in-memory filter facets are rebuilt from scratch
+    FACET_INDEX_TTL = int(os.getenv("FACET_INDEX_TTL", 900))
+
+    # Create the declared MongoDB indexes when the app starts
+    ENSURE_INDEXES = os.getenv("ENSURE_INDEXES", "1") == "1"
+
+    # Seconds before the in-memory course catalog is rebuilt from the courses collection
+    COURSE_CATALOG_TTL = int(os.getenv("COURSE_CATALOG_TTL", 600))
+
+    # Rendered-page cache for anonymous visitors of public pages
+    PAGE_CACHE_SIZE = int(os.getenv("PAGE_CACHE_SIZE", 512))
+    PAGE_CACHE_TTL = int(os.getenv("PAGE_CACHE_TTL", 300))
+
+    # Batch recommendation precomputation (flask precompute-recommendations)
+    RECOMMENDATION_BATCH_WORKERS = int(os.getenv("RECOMMENDATION_BATCH_WORKERS", os.cpu_count() or 1))
+    RECOMMENDATION_BATCH_CHUNK_SIZE = int(os.getenv("RECOMMENDATION_BATCH_CHUNK_SIZE", 500))
+
+    # Seconds a logged-in user's users/students documents stay in the per-process cache (0 disables)
+    IDENTITY_CACHE_TTL = int(os.getenv("IDENTITY_CACHE_TTL", 30))
+
+    # Seconds before the admin dashboard aggregates are refreshed in the background
+    DASHBOARD_STATS_TTL = int(os.getenv("DASHBOARD_STATS_TTL", 300))
+
+    # MongoDB commands slower than this many milliseconds are logged (see /admin/metrics)
+    SLOW_QUERY_MS = int(os.getenv("SLOW_QUERY_MS", 100))
+
+    # Threads for running a request's independent MongoDB queries concurrently (0 runs them in turn)
+    QUERY_FANOUT_WORKERS = int(os.getenv("QUERY_FANOUT_WORKERS", 8))
+
+    # Seconds after a college write before this process updates the similar-colleges table
+    # (-1: leave it to `flask similar-colleges-worker`; builds load every college, so small catalogs only)
+    SIMILAR_REBUILD_DELAY = int(os.getenv("SIMILAR_REBUILD_DELAY", -1))
+
+    # Tail a change stream on colleges so every worker invalidates its caches (needs a replica set)
+    COLLEGE_CHANGE_STREAM = os.getenv("COLLEGE_CHANGE_STREAM", "0") == "1"
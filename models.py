@@ -1,88 +1,63 @@
-from flask_login import UserMixin
-from werkzeug.security import generate_password_hash, check_password_hash
-from app import db
-
-class User(UserMixin):
-    def __init__(self, username, email, password, role='user', _id=None):
-        self.username = username
-        self.email = email
-        self.password = generate_password_hash(password)
-        self.role = role
-        self._id = _id or username
-
-    def check_password(self, password):
-        return check_password_hash(self.password, password)
-
-    def get_id(self):
-        return self._id
-
-    @staticmethod
-    def get_by_username(username):
-        user_data = db.users.find_one({"username": username})
-        if not user_data:
-            return None
-        return User(
-            username=user_data['username'],
-            email=user_data['email'],
-            password=user_data['password'],
-            role=user_data.get('role', 'user'),
-            _id=user_data['_id']
-        )
-
-    @staticmethod
-    def get_by_email(email):
-        user_data = db.users.find_one({"email": email})
-        if not user_data:
-            return None
-        return User(
-            username=user_data['username'],
-            email=user_data['email'],
-            password=user_data['password'],
-            role=user_data.get('role', 'user'),
-            _id=user_data['_id']
-        )
-
-    def save(self):
-        db.users.update_one(
-            {"_id": self._id},
-            {"$set": {
-                "username": self.username,
-                "email": self.email,
-                "password": self.password,
-                "role": self.role
-            }},
-            upsert=True
-        )
-
-class College:
-    def __init__(self, name, location, courses, rating, description, _id=None):
-        self.name = name
-        self.location = location
-        self.courses = courses
-        self.rating = rating
-        self.description = description
-        self._id = _id or name.lower().replace(' ', '_')
-
-    def save(self):
-        db.colleges.update_one(
-            {"_id": self._id},
-            {"$set": {
-                "name": self.name,
-                "location": self.location,
-                "courses": self.courses,
-                "rating": self.rating,
-                "description": self.description
-            }},
-            upsert=True
-        )
-
-    @staticmethod
-    def get_all():
-        return [College(**college) for college in db.colleges.find()]
-
-    @staticmethod
-    def get_by_id(college_id):
-        college_data = db.colleges.find_one({"_id": college_id})
-        if not college_data:
-            return None
-        return College(**college_data)
\ No newline at end of file
+"""Read models for college documents.
+
+List and card views load colleges with SUMMARY_PROJECTION and wrap them in
+CollegeSummary. Only the fields a card renders cross the wire: cards get
+``description_excerpt``, which every write path stores next to the full
+description (services.keys.college_keys). Views that show or edit a whole
+college use CollegeDetail. Both use ``__slots__``, so a page of cards
+costs a few small objects instead of full BSON-decoded dicts.
+
+Writes still go through plain dicts in the blueprints.
+"""
+DESCRIPTION_EXCERPT = 160
+
+SUMMARY_FIELDS = ('college_name', 'city', 'state', 'courses', 'exam', 'ranking', 'avg_fee',
+                  'placement_rating', 'cutoff', 'facilities', 'college_website', 'image')
+DETAIL_FIELDS = SUMMARY_FIELDS + ('description', 'location', 'exam_accepted', 'user_id')
+
+SUMMARY_PROJECTION = {field: 1 for field in SUMMARY_FIELDS + ('description_excerpt',)}
+
+
+class _CollegeView:
+    __slots__ = ()
+    FIELDS = ()
+
+    def __init__(self, doc):
+        self._id = doc.get('_id')
+        for field in self.FIELDS:
+            setattr(self, field, doc.get(field))
+
+    @classmethod
+    def from_docs(cls, docs):
+        return [cls(doc) for doc in docs]
+
+    @property
+    def id(self):
+        return str(self._id) if self._id is not None else None
+
+    def get(self, field, default=None):
+        """dict-style access for templates written against raw documents."""
+        value = getattr(self, field, None)
+        return default if value is None else value
+
+
+class CollegeSummary(_CollegeView):
+    __slots__ = ('_id',) + SUMMARY_FIELDS + ('description', 'distance_km')
+    FIELDS = SUMMARY_FIELDS
+
+    def __init__(self, doc):
+        super().__init__(doc)
+        self.distance_km = doc.get('distance_km')  # set by nearby queries
+        excerpt = doc.get('description_excerpt')
+        if excerpt is None:  # written before excerpts were stored, or a full document
+            excerpt = (doc.get('description') or '')[:DESCRIPTION_EXCERPT]
+        self.description = excerpt
+
+
+class CollegeDetail(_CollegeView):
+    __slots__ = ('_id',) + DETAIL_FIELDS
+    FIELDS = DETAIL_FIELDS
+
+
+def find_summaries(collection, query, limit=0):
+    return CollegeSummary.from_docs(collection.find(query, SUMMARY_PROJECTION).limit(limit))
@@ -0,0 +1,183 @@
+"""Fingerprinted static assets.
+
+At startup every file under ``static/`` is hashed, and ``asset_url('css/style.css')``
+emits ``/assets/css/style.<hash>.css``. Because the URL changes whenever the
+content does, those responses carry a one-year ``immutable`` Cache-Control
+and browsers never revalidate them. ``flask build-assets`` writes
+precompressed siblings for text assets, named after the hashed file
+(``style.<hash>.css.gz``/``.br``), so an edited file never picks up the
+compressed bytes of its old content. They are served when the client's
+Accept-Encoding allows it.
+"""
+import gzip
+import hashlib
+import mimetypes
+import os
+import re
+import threading
+
+import click
+from flask import abort, request, send_from_directory, url_for
+from werkzeug.security import safe_join
+
+try:
+    import brotli
+except ImportError:  # optional; only gzip variants are built without it
+    brotli = None
+
+HASH_LENGTH = 12
+IMMUTABLE = 'public, max-age=31536000, immutable'
+COMPRESSIBLE = {'.css', '.js', '.svg', '.json', '.txt', '.html'}
+MIN_COMPRESS_SIZE = 512
+# Precompressed siblings, in order of preference.
+ENCODINGS = (('br', '.br'), ('gzip', '.gz'))
+
+_HASHED_NAME = re.compile(r'^(?P<stem>.+)\.(?P<hash>[0-9a-f]{%d})(?P<ext>\.[^./]+)?$' % HASH_LENGTH)
+
+
+def _file_hash(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as fh:
+        for chunk in iter(lambda: fh.read(65536), b''):
+            digest.update(chunk)
+    return digest.hexdigest()[:HASH_LENGTH]
+
+
+def _hashed_name(filename, file_hash):
+    stem, ext = os.path.splitext(filename)
+    return '%s.%s%s' % (stem, file_hash, ext)
+
+
+class AssetManifest:
+    def __init__(self, static_folder):
+        self.static_folder = static_folder
+        self.by_source = {}  # 'css/style.css' -> 'css/style.<hash>.css'
+        self.by_hashed = {}  # reverse mapping used when serving
+        self._lock = threading.Lock()
+
+    def scan(self):
+        for root, _, files in os.walk(self.static_folder):
+            for name in files:
+                if name.endswith(('.gz', '.br', '.tmp')):
+                    continue
+                path = os.path.join(root, name)
+                self.add(os.path.relpath(path, self.static_folder).replace(os.sep, '/'))
+
+    def add(self, filename):
+        path = os.path.join(self.static_folder, filename)
+        if not os.path.isfile(path):
+            return None
+        hashed = _hashed_name(filename, _file_hash(path))
+        with self._lock:
+            self.by_source[filename] = hashed
+            self.by_hashed[hashed] = filename
+        return hashed
+
+    def hashed(self, filename):
+        # Files written after startup (uploads, image variants) are hashed on first use.
+        return self.by_source.get(filename) or self.add(filename)
+
+    def resolve(self, hashed):
+        """Source file for a hashed name, or None.
+
+        Names this process has not seen yet (a file written after startup
+        whose URL another worker rendered) are checked against the file's
+        current content instead.
+        """
+        source = self.by_hashed.get(hashed)
+        if source is not None:
+            return source
+        match = _HASHED_NAME.match(hashed)
+        if not match:
+            return None
+        source = match.group('stem') + (match.group('ext') or '')
+        path = safe_join(self.static_folder, source)
+        if path is None or not os.path.isfile(path) or _file_hash(path) != match.group('hash'):
+            return None
+        return source if self.add(source) == hashed else None
+
+
+_manifest = None
+
+
+def asset_url(filename):
+    """Fingerprinted URL for a static file; plain static URL if unknown."""
+    hashed = _manifest.hashed(filename) if _manifest and filename else None
+    if hashed:
+        return url_for('asset', filename=hashed)
+    return url_for('static', filename=filename)
+
+
+def serve_asset(filename):
+    source = _manifest.resolve(filename)
+    if source is None:
+        abort(404)
+
+    mimetype = mimetypes.guess_type(source)[0] or 'application/octet-stream'
+    accepted = request.accept_encodings
+    served, encoding = source, None
+    if os.path.splitext(source)[1] in COMPRESSIBLE:
+        for name, suffix in ENCODINGS:
+            if accepted[name] and os.path.isfile(os.path.join(_manifest.static_folder, filename + suffix)):
+                served, encoding = filename + suffix, name
+                break
+
+    response = send_from_directory(_manifest.static_folder, served, mimetype=mimetype, max_age=31536000)
+    response.headers['Cache-Control'] = IMMUTABLE
+    response.vary.add('Accept-Encoding')
+    if encoding:
+        response.headers['Content-Encoding'] = encoding
+    return response
+
+
+def _stale_siblings(root, files, name, current):
+    """Compressed siblings of ``name`` built from an earlier version of it."""
+    stem, ext = os.path.splitext(name)
+    for other in files:
+        base, suffix = os.path.splitext(other)
+        match = _HASHED_NAME.match(base)
+        if (suffix in ('.gz', '.br') and match and base != current
+                and match.group('stem') == stem and (match.group('ext') or '') == ext):
+            yield os.path.join(root, other)
+
+
+def precompress(static_folder):
+    """Write .gz (and .br when brotli is installed) siblings of text assets.
+
+    Siblings are named after the hashed file; ones left over from earlier
+    content are removed.
+    """
+    written = 0
+    for root, _, files in os.walk(static_folder):
+        for name in files:
+            path = os.path.join(root, name)
+            if os.path.splitext(name)[1] not in COMPRESSIBLE or os.path.getsize(path) < MIN_COMPRESS_SIZE:
+                continue
+            with open(path, 'rb') as fh:
+                data = fh.read()
+            hashed = _hashed_name(name, hashlib.sha256(data).hexdigest()[:HASH_LENGTH])
+            for stale in _stale_siblings(root, files, name, hashed):
+                os.remove(stale)
+            variants = [('.gz', gzip.compress(data, compresslevel=9, mtime=0))]
+            if brotli is not None:
+                variants.append(('.br', brotli.compress(data, quality=11)))
+            for suffix, payload in variants:
+                if len(payload) < len(data):
+                    with open(os.path.join(root, hashed + suffix), 'wb') as fh:
+                        fh.write(payload)
+                    written += 1
+    return written
+
+
+def init_app(app):
+    global _manifest
+    _manifest = AssetManifest(app.static_folder)
+    _manifest.scan()
+
+    app.add_url_rule('/assets/<path:filename>', 'asset', serve_asset)
+    app.add_template_global(asset_url)
+
+    @app.cli.command('build-assets')
+    def build_assets_command():
+        """Precompress static text assets (gzip, plus brotli if installed)."""
+        click.echo('%d precompressed files written' % precompress(app.static_folder))
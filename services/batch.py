@@ -0,0 +1,208 @@
+"""Batch precomputation of student recommendations.
+
+``flask precompute-recommendations`` scores students in chunks across a
+process pool. Each worker builds its own college snapshot once. Results
+go into the ``recommendations`` collection (``_id`` = user_id) with one
+bulk_write per chunk. ``flask recommendations-worker`` repeats that on an
+interval.
+
+Runs are incremental. A student is recomputed only when one of these holds:
+
+* their scoring fields changed (stored ``profile_key`` differs),
+* their stored list contains a college that changed or was deleted since
+  the last run, or
+* a new or changed college now scores at least as high as the last entry
+  of their stored list, so it may enter it.
+
+Changed colleges are found by diffing a per-college fingerprint of the
+scoring fields against ``recommendation_college_state``.
+
+Every stored result carries the college catalog version
+(services.colleges.catalog_version) read when the run started; the run
+also restamps the results it verified as unaffected. The recommendations
+page serves a stored result only while no college has been written since,
+and scores live otherwise.
+"""
+import json
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+
+import click
+from pymongo import DeleteMany, ReplaceOne, UpdateOne
+
+from config import Config
+from services.colleges import catalog_version
+from services.db import get_client
+from models import SUMMARY_PROJECTION
+from services.recommender import DEFAULT_TOP_K, CollegeSnapshot, fingerprint, profile_key
+
+SCORING_FIELDS = ('courses', 'city', 'location', 'state', 'avg_fee', 'cutoff', 'placement_rating')
+SCORING_PROJECTION = {field: 1 for field in SCORING_FIELDS + ('course_keys', 'city_key', 'geo')}
+STUDENT_FIELDS = {'user_id': 1, 'desired_course': 1, 'location_pref': 1, 'budget': 1,
+                  'academic_profile.graduation_cgpa': 1}
+
+_worker_snapshot = None
+
+
+def _score_chunk(snapshot, students, k):
+    results = []
+    for student in students:
+        rows, scores = snapshot.top_k(student, k)
+        results.append({
+            'user_id': student['user_id'],
+            'profile_key': profile_key(student),
+            'colleges': [snapshot.docs[row]['_id'] for row in rows],
+            'scores': [int(score) for score in scores],
+        })
+    return results
+
+
+def _init_worker():
+    global _worker_snapshot
+    db = get_client().get_default_database()
+    _worker_snapshot = CollegeSnapshot(db.colleges.find({}, SCORING_PROJECTION))
+
+
+def _score_chunk_in_worker(students, k):
+    return _score_chunk(_worker_snapshot, students, k)
+
+
+def _chunks(items, size):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def _changed_colleges(db):
+    """Return (current fingerprints, changed-or-new docs, changed-or-deleted ids)."""
+    current = {}
+    docs = {}
+    for college in db.colleges.find({}, SCORING_PROJECTION):
+        current[college['_id']] = fingerprint(college, SCORING_FIELDS)
+        docs[college['_id']] = college
+    previous = {doc['_id']: doc['fingerprint'] for doc in db.recommendation_college_state.find({})}
+
+    changed = [docs[cid] for cid, fp in current.items() if previous.get(cid) != fp]
+    stale_ids = {cid for cid, fp in previous.items() if current.get(cid) != fp}
+    return current, changed, stale_ids
+
+
+def _needs_update(student, stored, changed_snapshot, stale_ids, k):
+    if stored is None or stored.get('profile_key') != profile_key(student):
+        return True
+    if stale_ids.intersection(stored.get('colleges', [])):
+        return True
+    if changed_snapshot.size:
+        scores = changed_snapshot.score(student)
+        threshold = stored['scores'][-1] if len(stored.get('scores', [])) >= k else 1
+        return bool((scores >= threshold).any())
+    return False
+
+
+def _write_results(db, results, version):
+    now = datetime.now(timezone.utc)
+    ops = [UpdateOne({'_id': r['user_id']}, {'$set': {
+        'profile_key': r['profile_key'],
+        'colleges': r['colleges'],
+        'scores': r['scores'],
+        'catalog_version': version,
+        'computed_at': now,
+    }}, upsert=True) for r in results]
+    if ops:
+        db.recommendations.bulk_write(ops, ordered=False)
+
+
+def precompute(db, full=False, workers=None, chunk_size=None, k=DEFAULT_TOP_K, log=None):
+    """Recompute stored recommendations; returns a summary dict."""
+    workers = Config.RECOMMENDATION_BATCH_WORKERS if workers is None else workers
+    chunk_size = chunk_size or Config.RECOMMENDATION_BATCH_CHUNK_SIZE
+    started = time.monotonic()
+
+    # Read before the colleges: a write landing mid-run leaves results stale.
+    version = catalog_version(db)
+    fingerprints, changed, stale_ids = _changed_colleges(db)
+    students = [s for s in db.students.find({}, STUDENT_FIELDS) if s.get('user_id')]
+    if full:
+        todo = students
+    else:
+        stored = {doc['_id']: doc for doc in db.recommendations.find({}, {'profile_key': 1, 'colleges': 1, 'scores': 1})}
+        changed_snapshot = CollegeSnapshot(changed)
+        todo = [s for s in students
+                if _needs_update(s, stored.get(s['user_id']), changed_snapshot, stale_ids, k)]
+
+    written = 0
+    if todo:
+        chunks = list(_chunks(todo, chunk_size))
+        if workers and workers > 1 and len(chunks) > 1:
+            with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as pool:
+                for results in pool.map(_score_chunk_in_worker, chunks, [k] * len(chunks)):
+                    _write_results(db, results, version)
+                    written += len(results)
+                    if log:
+                        log('%d/%d students' % (written, len(todo)))
+        else:
+            snapshot = CollegeSnapshot(db.colleges.find({}, SCORING_PROJECTION))
+            for chunk in chunks:
+                results = _score_chunk(snapshot, chunk, k)
+                _write_results(db, results, version)
+                written += len(results)
+
+    if full:
+        db.recommendations.delete_many({'_id': {'$nin': [s['user_id'] for s in students]}})
+    else:
+        # Everyone not recomputed was checked against this version's changes.
+        db.recommendations.update_many({'catalog_version': {'$ne': version}},
+                                       {'$set': {'catalog_version': version}})
+
+    # Remember what the colleges looked like for the next incremental run.
+    changed_ids = {college['_id'] for college in changed}
+    state_ops = [ReplaceOne({'_id': cid}, {'_id': cid, 'fingerprint': fingerprints[cid]}, upsert=True)
+                 for cid in changed_ids]
+    deleted = [cid for cid in stale_ids if cid not in fingerprints]
+    if deleted:
+        state_ops.append(DeleteMany({'_id': {'$in': deleted}}))
+    if state_ops:
+        db.recommendation_college_state.bulk_write(state_ops, ordered=False)
+
+    return {
+        'students': len(students),
+        'recomputed': written,
+        'changed_colleges': len(changed) + len(deleted),
+        'seconds': round(time.monotonic() - started, 3),
+    }
+
+
+def load_precomputed(db, student):
+    """Stored recommendations for a student as college docs, or None.
+
+    None means "score live": nothing stored yet, or the profile or a college
+    changed since the last batch run.
+    """
+    stored = db.recommendations.find_one({'_id': student.get('user_id')})
+    if (not stored or stored.get('profile_key') != profile_key(student)
+            or stored.get('catalog_version') != catalog_version(db)):
+        return None
+    ids = stored.get('colleges', [])
+    by_id = {college['_id']: college for college in db.colleges.find({'_id': {'$in': ids}}, SUMMARY_PROJECTION)}
+    return [by_id[cid] for cid in ids if cid in by_id]
+
+
+def init_app(app):
+    @app.cli.command('precompute-recommendations')
+    @click.option('--full', is_flag=True, help='Recompute every student, not just affected ones.')
+    @click.option('--workers', type=int, default=None, help='Process pool size (1 = inline).')
+    @click.option('--chunk-size', type=int, default=None, help='Students per work unit.')
+    def precompute_command(full, workers, chunk_size):
+        """Precompute top-k recommendations for all students."""
+        db = get_client().get_default_database()
+        summary = precompute(db, full=full, workers=workers, chunk_size=chunk_size, log=click.echo)
+        click.echo(json.dumps(summary))
+
+    @app.cli.command('recommendations-worker')
+    @click.option('--interval', type=int, default=600, help='Seconds between incremental runs.')
+    def worker_command(interval):
+        """Run incremental precomputation forever (for a process supervisor)."""
+        db = get_client().get_default_database()
+        while True:
+            click.echo(json.dumps(precompute(db, log=click.echo)))
+            time.sleep(interval)
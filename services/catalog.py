@@ -0,0 +1,115 @@
+"""Course vocabulary for the student profile form.
+
+The deduplicated, normalized list of course names is kept in memory. It is
+built once from the ``courses`` collection, extended in place when admin or
+college forms add courses, and rebuilt after a TTL so other workers' additions
+show up. The profile page no longer scans the collection on every request.
+"""
+import threading
+import time
+
+from pymongo import DeleteMany, UpdateOne
+
+from config import Config
+
+
+def normalize_course(name):
+    """Strip and collapse internal whitespace ("  B. Tech " -> "B. Tech")."""
+    return ' '.join((name or '').split())
+
+
+def _names_from_doc(doc):
+    # Admin/college forms store one course per document; older seed data
+    # stores a comma-separated "courses" string.
+    if doc.get('course_name'):
+        yield doc['course_name']
+    courses = doc.get('courses')
+    if isinstance(courses, str):
+        yield from courses.split(',')
+    elif isinstance(courses, list):
+        yield from courses
+
+
+class CourseCatalog:
+    def __init__(self, ttl=600):
+        self.ttl = ttl
+        self._names = None  # casefolded key -> display name
+        self._sorted = None
+        self._built_at = 0
+        self._lock = threading.Lock()
+
+    def _expired(self):
+        return self._names is None or (self.ttl and time.monotonic() - self._built_at > self.ttl)
+
+    def rebuild(self, db):
+        names = {}
+        for doc in db.courses.find({}, {'course_name': 1, 'courses': 1, '_id': 0}):
+            for name in _names_from_doc(doc):
+                name = normalize_course(name)
+                if name:
+                    names.setdefault(name.casefold(), name)
+        with self._lock:
+            self._names = names
+            self._sorted = None
+            self._built_at = time.monotonic()
+        return names
+
+    def courses(self, db):
+        """Sorted, deduplicated course names."""
+        # Work on a local reference: invalidate() may reset _names meanwhile.
+        names = self._names
+        if names is None or self._expired():
+            names = self.rebuild(db)
+        with self._lock:
+            if names is self._names:
+                if self._sorted is None:
+                    self._sorted = sorted(names.values(), key=str.casefold)
+                return self._sorted
+        return sorted(names.values(), key=str.casefold)
+
+    def add(self, names):
+        """Record course names just written to the courses collection."""
+        with self._lock:
+            if self._names is None:
+                return  # first read does a full build
+            for name in names:
+                name = normalize_course(name)
+                if name and name.casefold() not in self._names:
+                    self._names[name.casefold()] = name
+                    self._sorted = None
+
+    def invalidate(self):
+        with self._lock:
+            self._names = None
+            self._sorted = None
+
+
+catalog = CourseCatalog(ttl=Config.COURSE_CATALOG_TTL)
+
+
+def sync_courses(db, college_id, course_names):
+    """Make the college's ``courses`` documents match ``course_names``.
+
+    One read of the college's current courses, then a single unordered
+    bulk_write of upserts for new names and a delete for dropped ones. The
+    unique (course_name, college_id) index makes concurrent saves of the same
+    course converge on one document. Returns (added, removed) name lists.
+    """
+    wanted = list(dict.fromkeys(n for n in map(normalize_course, course_names) if n))
+    existing = {doc['course_name'] for doc in db.courses.find(
+        {'college_id': college_id}, {'course_name': 1, '_id': 0}) if doc.get('course_name')}
+
+    added = [name for name in wanted if name not in existing]
+    removed = sorted(existing.difference(wanted))
+
+    ops = [UpdateOne({'course_name': name, 'college_id': college_id},
+                     {'$setOnInsert': {'course_name': name, 'college_id': college_id}},
+                     upsert=True)
+           for name in added]
+    if removed:
+        ops.append(DeleteMany({'college_id': college_id, 'course_name': {'$in': removed}}))
+    if ops:
+        db.courses.bulk_write(ops, ordered=False)
+
+    catalog.add(added)
+    return added, removed
@@ -0,0 +1,275 @@
+"""College repository: the single write path for the colleges collection.
+
+Routes create, update and delete colleges through ``college_repository``.
+The repository stores the derived match keys (services.keys), performs the
+write and then emits a post-commit event:
+
+* ``created``: the new document;
+* ``updated``: the old and new documents and the set of changed fields;
+* ``deleted``: the removed document;
+* ``reloaded``: many colleges changed at once (bulk import, lost stream
+  history), so everything built from colleges must be rebuilt.
+
+Handlers are registered with ``on_created``/``on_updated``/``on_deleted``/
+``on_reloaded``. They come in two scopes:
+
+* Database handlers keep derived data in MongoDB in step (the ``courses``
+  collection, the similar-colleges table). They run once, in the process
+  that made the write.
+* ``in_memory`` handlers maintain per-process caches (recommendation
+  snapshot, page cache, facets, dashboard totals). They also run in the
+  writing process. Other web workers catch up through each cache's TTL.
+
+With COLLEGE_CHANGE_STREAM=1 (needs a replica set, even a single-node
+one), every process instead tails a change stream on ``colleges``. The
+``in_memory`` handlers then run from the stream, for its own writes and
+for every other process's writes, so all workers invalidate together.
+Stream events only carry the new document. Handlers see ``old=None`` and
+fall back to coarse invalidation.
+
+A handler that fails is logged and never fails the write. The write is
+already committed, and the affected cache still expires by TTL.
+
+Every write also bumps a catalog version counter in MongoDB
+(``catalog_version``). Stored recommendations (services.batch) record the
+version they were computed against, and older ones are not served.
+
+When SIMILAR_REBUILD_DELAY is enabled, a change to a feature field also
+schedules a delayed incremental build of the similar-colleges table
+(services.similar). The build finds the affected colleges by fingerprint.
+"""
+import logging
+import os
+import threading
+import time
+
+from pymongo.errors import PyMongoError
+
+from services.catalog import catalog, sync_courses
+from services.db import get_client
+from services.facets import FACET_FIELDS, facets
+from services.keys import college_keys
+from services.page_cache import page_cache
+from services.recommender import engine
+from services.similar import FEATURE_FIELDS as SIMILARITY_FIELDS, similar_rebuilds
+from services.stats import dashboard_stats
+
+log = logging.getLogger(__name__)
+
+CREATED, UPDATED, DELETED, RELOADED = 'created', 'updated', 'deleted', 'reloaded'
+EVENTS = (CREATED, UPDATED, DELETED, RELOADED)
+STREAM_RETRY_SECONDS = 5
+CATALOG_VERSION_ID = 'colleges'
+
+
+class CollegeEvent:
+    __slots__ = ('kind', 'college_id', 'old', 'new', 'changed')
+
+    def __init__(self, kind, college_id=None, old=None, new=None, changed=None):
+        self.kind = kind
+        self.college_id = college_id
+        self.old = old          # None when unknown (change stream events)
+        self.new = new
+        self.changed = changed  # frozenset of top-level fields; None means "any"
+
+    def touches(self, fields):
+        return self.changed is None or not self.changed.isdisjoint(fields)
+
+
+class CollegeRepository:
+    def __init__(self):
+        self._handlers = []  # (kinds, handler, in_memory)
+        self.change_stream = False
+        self._watcher_pid = None
+        self._lock = threading.Lock()
+
+    # --- subscriptions -----------------------------------------------------
+
+    def subscribe(self, kinds, handler, in_memory=False):
+        self._handlers.append((frozenset(kinds), handler, in_memory))
+        return handler
+
+    def _decorator(self, kinds, in_memory):
+        return lambda handler: self.subscribe(kinds, handler, in_memory)
+
+    def on_created(self, in_memory=False):
+        return self._decorator((CREATED,), in_memory)
+
+    def on_updated(self, in_memory=False):
+        return self._decorator((UPDATED,), in_memory)
+
+    def on_deleted(self, in_memory=False):
+        return self._decorator((DELETED,), in_memory)
+
+    def on_reloaded(self, in_memory=False):
+        return self._decorator((RELOADED,), in_memory)
+
+    def on_any(self, in_memory=False):
+        return self._decorator(EVENTS, in_memory)
+
+    def _emit(self, db, event, from_stream=False):
+        for kinds, handler, in_memory in self._handlers:
+            if event.kind not in kinds:
+                continue
+            if from_stream and not in_memory:
+                continue  # already run by the writing process
+            if in_memory and self.change_stream and not from_stream:
+                continue  # the stream delivers this write to every process
+            try:
+                handler(db, event)
+            except Exception:
+                log.exception('College %s handler %s failed', event.kind, handler.__name__)
+
+    # --- writes ----------------------------------------------------------
+
+    def create(self, db, doc):
+        """Insert a college (``doc`` gains its keys and ``_id``); returns the id."""
+        doc.update(college_keys(doc))
+        college_id = db.colleges.insert_one(doc).inserted_id
+        self._emit(db, CollegeEvent(CREATED, college_id, new=doc, changed=frozenset(doc)))
+        return college_id
+
+    def update(self, db, old, fields):
+        """$set ``fields`` on the college ``old``; returns the set of changed fields."""
+        fields = dict(fields)
+        fields.update(college_keys({**old, **fields}))
+        db.colleges.update_one({'_id': old['_id']}, {'$set': fields})
+        changed = frozenset(field for field, value in fields.items() if old.get(field) != value)
+        if changed:
+            self._emit(db, CollegeEvent(UPDATED, old['_id'], old=old, new={**old, **fields}, changed=changed))
+        return changed
+
+    def delete(self, db, college_id):
+        """Delete a college; returns the removed document or None."""
+        old = db.colleges.find_one_and_delete({'_id': college_id})
+        if old:
+            self._emit(db, CollegeEvent(DELETED, college_id, old=old))
+        return old
+
+    def reloaded(self, db):
+        """Announce a bulk write made outside the repository (e.g. an import)."""
+        self._emit(db, CollegeEvent(RELOADED))
+
+    # --- change stream -----------------------------------------------------
+
+    def _event_from_change(self, change):
+        kind = change['operationType']
+        college_id = change.get('documentKey', {}).get('_id')
+        if kind == 'insert':
+            doc = change['fullDocument']
+            return CollegeEvent(CREATED, college_id, new=doc, changed=frozenset(doc))
+        if kind == 'update':
+            description = change.get('updateDescription', {})
+            fields = list(description.get('updatedFields', {})) + list(description.get('removedFields', []))
+            changed = frozenset(field.split('.', 1)[0] for field in fields)
+            return CollegeEvent(UPDATED, college_id, new=change.get('fullDocument'), changed=changed)
+        if kind == 'replace':
+            return CollegeEvent(UPDATED, college_id, new=change.get('fullDocument'))
+        if kind == 'delete':
+            return CollegeEvent(DELETED, college_id)
+        return CollegeEvent(RELOADED)  # drop, rename, invalidate
+
+    def _watch(self):
+        token = None
+        while True:
+            db = get_client().get_default_database()
+            try:
+                with db.colleges.watch(full_document='updateLookup', resume_after=token) as stream:
+                    for change in stream:
+                        token = stream.resume_token
+                        self._emit(db, self._event_from_change(change), from_stream=True)
+            except PyMongoError:
+                log.exception('College change stream failed; restarting in %ds', STREAM_RETRY_SECONDS)
+                # Events may have been missed: rebuild everything and start afresh.
+                token = None
+                self._emit(db, CollegeEvent(RELOADED), from_stream=True)
+                time.sleep(STREAM_RETRY_SECONDS)
+
+    def start_watching(self):
+        """Start this process's change stream thread (once per pid)."""
+        pid = os.getpid()
+        if self._watcher_pid == pid:
+            return
+        with self._lock:
+            if self._watcher_pid != pid:
+                threading.Thread(target=self._watch, name='college-change-stream', daemon=True).start()
+                self._watcher_pid = pid
+
+
+college_repository = CollegeRepository()
+
+
+def catalog_version(db):
+    """Counter bumped after every college write made through the repository."""
+    doc = db.catalog_versions.find_one({'_id': CATALOG_VERSION_ID}, {'version': 1})
+    return doc['version'] if doc else 0
+
+
+# --- derived data ------------------------------------------------------------
+
+@college_repository.on_any()
+def _catalog_version(db, event):
+    db.catalog_versions.update_one({'_id': CATALOG_VERSION_ID}, {'$inc': {'version': 1}}, upsert=True)
+
+
+@college_repository.on_created()
+def _courses_created(db, event):
+    sync_courses(db, event.college_id, event.new.get('courses') or [])
+
+
+@college_repository.on_updated()
+def _courses_updated(db, event):
+    if event.touches(('courses',)):
+        sync_courses(db, event.college_id, event.new.get('courses') or [])
+
+
+@college_repository.on_deleted()
+def _courses_deleted(db, event):
+    sync_courses(db, event.college_id, [])
+
+
+@college_repository.on_any()
+def _similar_colleges(db, event):
+    if event.kind != UPDATED or event.touches(SIMILARITY_FIELDS):
+        similar_rebuilds.schedule()
+
+
+@college_repository.on_any(in_memory=True)
+def _recommendations_and_pages(db, event):
+    engine.invalidate()
+    page_cache.invalidate('colleges')
+
+
+@college_repository.on_any(in_memory=True)
+def _facets(db, event):
+    if event.kind == CREATED:
+        facets.on_insert(event.new)
+    elif event.kind == DELETED and event.old:
+        facets.on_delete(event.old)
+    elif event.kind == UPDATED and event.old and event.new:
+        if event.touches(FACET_FIELDS):
+            facets.on_update(event.old, event.new)
+    elif event.touches(FACET_FIELDS):
+        facets.invalidate()
+
+
+@college_repository.on_any(in_memory=True)
+def _dashboard_totals(db, event):
+    if event.kind == CREATED:
+        dashboard_stats.incr('colleges')
+    elif event.kind == DELETED:
+        dashboard_stats.incr('colleges', -1)
+    elif event.kind == RELOADED:
+        dashboard_stats.invalidate()
+
+
+@college_repository.on_reloaded(in_memory=True)
+def _course_catalog(db, event):
+    catalog.invalidate()
+
+
+def init_app(app):
+    college_repository.change_stream = app.config.get('COLLEGE_CHANGE_STREAM', False)
+    if college_repository.change_stream:
+        # Started lazily so every forked worker gets its own stream thread.
+        app.before_request(college_repository.start_watching)
@@ -1,24 +1,167 @@
 import os
-from flask import current_app, g
+import threading
+from flask import g
 from pymongo import MongoClient
-from dotenv import load_dotenv
+from pymongo.monitoring import ConnectionPoolListener
 
-# Load environment variables
-load_dotenv()
+from config import Config
 
 # App configuration
-SECRET_KEY = os.getenv("SECRET_KEY", "dev-key")
-MONGO_URI = os.getenv("MONGO_URI", "mongodb://localhost:27017/studyway")
+SECRET_KEY = Config.SECRET_KEY
+MONGO_URI = Config.MONGO_URI
+
+# One MongoClient per worker process. MongoClient is thread-safe and keeps its
+# own connection pool, so every request shares it instead of reconnecting.
+_client = None
+_client_pid = None
+_client_lock = threading.Lock()
+
+
+class PoolStats(ConnectionPoolListener):
+    """Counts connection pool events so pool sizing can be checked."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.counters = {
+                'pools_created': 0,
+                'pools_cleared': 0,
+                'connections_created': 0,
+                'connections_closed': 0,
+                'checked_out': 0,
+                'checked_in': 0,
+                'checkout_failures': 0,
+            }
+
+    def _incr(self, key):
+        with self._lock:
+            self.counters[key] += 1
+
+    def pool_created(self, event):
+        self._incr('pools_created')
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_cleared(self, event):
+        self._incr('pools_cleared')
+
+    def pool_closed(self, event):
+        pass
+
+    def connection_created(self, event):
+        self._incr('connections_created')
+
+    def connection_ready(self, event):
+        pass
+
+    def connection_closed(self, event):
+        self._incr('connections_closed')
+
+    def connection_check_out_started(self, event):
+        pass
+
+    def connection_check_out_failed(self, event):
+        self._incr('checkout_failures')
+
+    def connection_checked_out(self, event):
+        self._incr('checked_out')
+
+    def connection_checked_in(self, event):
+        self._incr('checked_in')
+
+    def snapshot(self):
+        with self._lock:
+            stats = dict(self.counters)
+        stats['open_connections'] = stats['connections_created'] - stats['connections_closed']
+        stats['in_use'] = stats['checked_out'] - stats['checked_in']
+        return stats
+
+
+_pool_stats = PoolStats()
+_event_listeners = [_pool_stats]
+
+
+def register_listener(listener):
+    """Attach a pymongo event listener to clients created from now on"""
+    if listener not in _event_listeners:
+        _event_listeners.append(listener)
+
+
+def _new_client():
+    return MongoClient(
+        MONGO_URI,
+        maxPoolSize=Config.MONGO_MAX_POOL_SIZE,
+        minPoolSize=Config.MONGO_MIN_POOL_SIZE,
+        maxIdleTimeMS=Config.MONGO_MAX_IDLE_TIME_MS,
+        waitQueueTimeoutMS=Config.MONGO_WAIT_QUEUE_TIMEOUT_MS,
+        connectTimeoutMS=Config.MONGO_CONNECT_TIMEOUT_MS,
+        socketTimeoutMS=Config.MONGO_SOCKET_TIMEOUT_MS,
+        serverSelectionTimeoutMS=Config.MONGO_SERVER_SELECTION_TIMEOUT_MS,
+        readPreference=Config.MONGO_READ_PREFERENCE,
+        event_listeners=list(_event_listeners),
+    )
+
+
+def get_client():
+    """Return the process-wide MongoClient, creating it on first use.
+
+    The owning pid is remembered so a worker forked from a parent that already
+    opened a client builds its own instead of sharing the parent's sockets.
+    """
+    global _client, _client_pid
+    pid = os.getpid()
+    if _client is None or _client_pid != pid:
+        with _client_lock:
+            if _client is None or _client_pid != pid:
+                _client = _new_client()
+                _client_pid = pid
+                _pool_stats.reset()
+    return _client
+
+
+def _reset_after_fork():
+    # The inherited client belongs to the parent; never close it from the child.
+    global _client, _client_pid, _client_lock
+    _client = None
+    _client_pid = None
+    _client_lock = threading.Lock()
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reset_after_fork)
+
 
 def get_db():
-    """Get the MongoDB client and database"""
-    if 'mongo_client' not in g:
-        g.mongo_client = MongoClient(MONGO_URI)
-        g.db = g.mongo_client.get_default_database()
+    """Get the shared MongoDB database handle"""
+    if 'db' not in g:
+        g.db = get_client().get_default_database()
     return g.db
 
+
 def close_db(e=None):
-    """Close the MongoDB connection"""
-    client = g.pop('mongo_client', None)
-    if client is not None:
-        client.close()
+    """Drop the request's database handle; the pooled client stays open"""
+    g.pop('db', None)
+
+
+def shutdown_client():
+    """Close the process-wide client (e.g. at interpreter exit or in scripts)"""
+    global _client, _client_pid
+    with _client_lock:
+        if _client is not None and _client_pid == os.getpid():
+            _client.close()
+        _client = None
+        _client_pid = None
+
+
+def pool_stats():
+    """Connection pool counters for this worker process"""
+    stats = _pool_stats.snapshot()
+    stats['pid'] = os.getpid()
+    stats['max_pool_size'] = Config.MONGO_MAX_POOL_SIZE
+    stats['min_pool_size'] = Config.MONGO_MIN_POOL_SIZE
+    stats['read_preference'] = Config.MONGO_READ_PREFERENCE
+    return stats
@@ -0,0 +1,59 @@
+"""Concurrent fan-out of independent MongoDB queries within a request.
+
+``query_executor.gather(f, g, h)`` runs zero-argument callables at the same
+time and returns their results in order. Page latency becomes that of the
+slowest query instead of the sum of all of them.
+
+* The first callable runs on the calling thread. The rest go to a bounded
+  thread pool (QUERY_FANOUT_WORKERS) that shares the process MongoClient.
+  Keep the worker count well under MONGO_MAX_POOL_SIZE.
+* Each task runs in a copy of the caller's context, so ``g``, ``request``
+  and the per-request query metrics still work inside it.
+* A gather issued from a pool thread runs inline. Nested fan-out can
+  therefore never wait on a saturated pool.
+* Once every call has finished, the exception of the first failing call
+  (in call order) is re-raised.
+"""
+import contextvars
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait
+
+from config import Config
+
+THREAD_PREFIX = 'query-fanout'
+
+
+class QueryExecutor:
+    def __init__(self, max_workers=8):
+        self.max_workers = max_workers
+        self._pool = None
+        self._pool_pid = None
+        self._lock = threading.Lock()
+
+    def _executor(self):
+        # Threads do not survive fork; a forked worker builds its own pool.
+        pid = os.getpid()
+        if self._pool is None or self._pool_pid != pid:
+            with self._lock:
+                if self._pool is None or self._pool_pid != pid:
+                    self._pool = ThreadPoolExecutor(max_workers=self.max_workers,
+                                                    thread_name_prefix=THREAD_PREFIX)
+                    self._pool_pid = pid
+        return self._pool
+
+    def gather(self, *calls):
+        """Run the callables concurrently; returns their results in call order."""
+        if (len(calls) < 2 or self.max_workers < 1
+                or threading.current_thread().name.startswith(THREAD_PREFIX)):
+            return [call() for call in calls]
+        pool = self._executor()
+        futures = [pool.submit(contextvars.copy_context().run, call) for call in calls[1:]]
+        try:
+            first = calls[0]()
+        finally:
+            wait(futures)
+        return [first] + [future.result() for future in futures]
+
+
+query_executor = QueryExecutor(max_workers=Config.QUERY_FANOUT_WORKERS)
@@ -0,0 +1,81 @@
+"""Streaming CSV/NDJSON export of admin collections.
+
+Rows are generated straight from a Mongo cursor with a field projection and
+a server-side batch size, so memory stays constant however large the
+collection is, and the first bytes go out as soon as the first batch arrives.
+"""
+import csv
+import io
+import json
+
+BATCH_SIZE = 500
+FLUSH_ROWS = 100  # CSV rows per yielded chunk
+# Cells starting with these are evaluated as formulas by spreadsheet apps.
+FORMULA_PREFIXES = ('=', '+', '-', '@', '\t', '\r')
+
+# collection -> exported columns (dotted paths reach into subdocuments)
+EXPORT_FIELDS = {
+    'colleges': ['_id', 'college_name', 'city', 'state', 'college_website', 'ranking', 'avg_fee',
+                 'placement_rating', 'exam', 'cutoff', 'courses', 'facilities', 'image', 'description'],
+    'users': ['_id', 'email', 'role', 'name', 'first_name', 'last_name', 'college_name'],
+    'students': ['_id', 'user_id', 'first_name', 'last_name', 'desired_course', 'location_pref', 'budget',
+                 'academic_profile.tenth_percent', 'academic_profile.twelfth_percent',
+                 'academic_profile.graduation_cgpa', 'academic_profile.entrance_score'],
+}
+FORMATS = {
+    'csv': 'text/csv',
+    'ndjson': 'application/x-ndjson',
+}
+
+
+def _get(doc, path):
+    for part in path.split('.'):
+        if not isinstance(doc, dict):
+            return None
+        doc = doc.get(part)
+    return doc
+
+
+def _json_default(value):
+    return str(value)  # ObjectId, datetime and other BSON types
+
+
+def _csv_value(value):
+    if value is None:
+        return ''
+    if isinstance(value, list):
+        value = ', '.join(str(v) for v in value)  # same shape import-colleges reads
+    if isinstance(value, str) and value.startswith(FORMULA_PREFIXES):
+        # Registration fields are user-controlled; keep them inert when opened.
+        return "'" + value
+    return value
+
+
+def export_rows(db, collection, fmt):
+    """Yield encoded chunks (header first for CSV) for a whole collection."""
+    fields = EXPORT_FIELDS[collection]
+    projection = {field: 1 for field in fields}
+    cursor = db[collection].find({}, projection, batch_size=BATCH_SIZE).sort('_id', 1)
+
+    if fmt == 'csv':
+        buf = io.StringIO()
+        writer = csv.writer(buf)
+        writer.writerow(fields)
+        yield buf.getvalue()  # header goes out before the first batch is fetched
+        buf.seek(0)
+        buf.truncate()
+        rows = 0
+        for doc in cursor:
+            writer.writerow([_csv_value(_get(doc, field)) for field in fields])
+            rows += 1
+            if rows == FLUSH_ROWS:
+                yield buf.getvalue()
+                buf.seek(0)
+                buf.truncate()
+                rows = 0
+        if rows:
+            yield buf.getvalue()
+    else:
+        for doc in cursor:
+            row = {field: _get(doc, field) for field in fields}
+            yield json.dumps(row, default=_json_default, ensure_ascii=False) + '\n'
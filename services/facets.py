@@ -0,0 +1,114 @@
+"""Filter facets for the college listing.
+
+Keeps the distinct values of the filterable college fields, with a count of
+colleges per value, in memory. The index is built with one aggregation and
+then maintained incrementally from the college write paths, so listing pages
+no longer run a distinct() per filter on every request.
+"""
+import threading
+import time
+from collections import Counter
+
+from config import Config
+
+FACET_FIELDS = ('city', 'state', 'exam', 'placement_rating')
+
+
+def _is_facet_value(value):
+    """One rule for builds and incremental updates: no missing or blank values."""
+    return value is not None and not (isinstance(value, str) and not value.strip())
+
+
+def _facet_value(doc, field):
+    value = doc.get(field) if doc else None
+    return value if _is_facet_value(value) else None
+
+
+def _sort_key(value):
+    # Numbers before strings so mixed legacy data still sorts deterministically.
+    if isinstance(value, (int, float)):
+        return (0, value, '')
+    return (1, 0, str(value).lower())
+
+
+class FacetIndex:
+    def __init__(self, fields=FACET_FIELDS, ttl=900):
+        self.fields = fields
+        self.ttl = ttl
+        self._counts = None
+        self._built_at = 0
+        self._lock = threading.Lock()
+
+    def _expired(self):
+        return self._counts is None or (self.ttl and time.monotonic() - self._built_at > self.ttl)
+
+    def rebuild(self, db):
+        pipeline = [{'$facet': {
+            field: [
+                {'$match': {field: {'$nin': [None, '']}}},
+                {'$group': {'_id': '$' + field, 'count': {'$sum': 1}}},
+            ]
+            for field in self.fields
+        }}]
+        result = next(db.colleges.aggregate(pipeline), {})
+        counts = {field: Counter() for field in self.fields}
+        for field in self.fields:
+            for row in result.get(field, []):
+                if _is_facet_value(row['_id']):  # the $match only drops None and ''
+                    counts[field][row['_id']] = row['count']
+        with self._lock:
+            self._counts = counts
+            self._built_at = time.monotonic()
+        return counts
+
+    def _ensure(self, db):
+        # Work on a local reference: invalidate() may reset _counts meanwhile.
+        counts = self._counts
+        if counts is None or self._expired():
+            counts = self.rebuild(db)
+        return counts
+
+    def counts(self, db, field):
+        """[(value, count), ...] for one facet, sorted by value."""
+        counts = self._ensure(db)[field]
+        with self._lock:
+            items = [(value, n) for value, n in counts.items() if n > 0]
+        return sorted(items, key=lambda item: _sort_key(item[0]))
+
+    def values(self, db, field):
+        return [value for value, _ in self.counts(db, field)]
+
+    def all_counts(self, db):
+        return {field: self.counts(db, field) for field in self.fields}
+
+    # --- incremental maintenance -------------------------------------------
+
+    def _apply(self, doc, delta):
+        with self._lock:
+            if self._counts is None:
+                return  # nothing built yet (or invalidated); the next read rebuilds
+            for field in self.fields:
+                value = _facet_value(doc, field)
+                if value is None:
+                    continue
+                counter = self._counts[field]
+                counter[value] += delta
+                if counter[value] <= 0:
+                    del counter[value]
+
+    def on_insert(self, doc):
+        self._apply(doc, 1)
+
+    def on_update(self, old_doc, new_doc):
+        self._apply(old_doc, -1)
+        self._apply(new_doc, 1)
+
+    def on_delete(self, old_doc):
+        self._apply(old_doc, -1)
+
+    def invalidate(self):
+        with self._lock:
+            self._counts = None
+
+
+facets = FacetIndex(ttl=Config.FACET_INDEX_TTL)
@@ -0,0 +1,77 @@
+"""Offline geocoding of Indian cities and nearby-college queries.
+
+``data/india_cities.csv`` is a small bundled gazetteer of city and state
+names, coordinates and common alternate names. Colleges and students are
+geocoded from it at write time. The resulting GeoJSON point is stored as
+``geo`` (see services.keys), and the colleges ``geo`` field carries a
+2dsphere index. Names the gazetteer does not know get no point. They still
+match by exact city key.
+"""
+import csv
+import os
+import re
+import threading
+
+GAZETTEER_PATH = os.path.join(os.path.dirname(__file__), 'data', 'india_cities.csv')
+EARTH_RADIUS_KM = 6378.1
+# Choices offered by the "within N km" filter on the college listing.
+RADIUS_CHOICES_KM = (10, 25, 50, 100, 250)
+
+# Runs of anything but letters and digits (course keys in services.keys use it too).
+NON_ALNUM = re.compile(r'[\W_]+')
+
+_gazetteer = None  # city key -> [(state key, lng, lat, display name), ...]
+_lock = threading.Lock()
+
+
+def city_key(name):
+    """' Navi-Mumbai' -> 'navi mumbai' (also the city match key, see services.keys)."""
+    return ' '.join(NON_ALNUM.sub(' ', name).split()).casefold() if isinstance(name, str) else ''
+
+
+def _load():
+    global _gazetteer
+    with _lock:
+        if _gazetteer is None:
+            entries = {}
+            with open(GAZETTEER_PATH, newline='', encoding='utf-8') as fh:
+                for row in csv.DictReader(fh):
+                    entry = (city_key(row['state']), float(row['lng']), float(row['lat']), row['city'])
+                    for name in [row['city']] + [a for a in row['aliases'].split('|') if a]:
+                        entries.setdefault(city_key(name), []).append(entry)
+            _gazetteer = entries
+    return _gazetteer
+
+
+def canonical_city_key(name):
+    """city_key of the gazetteer's main name for ``name`` ('Bangalore' -> 'bengaluru')."""
+    key = city_key(name)
+    entries = (_gazetteer or _load()).get(key)
+    return city_key(entries[0][3]) if entries else key
+
+
+def point(lng, lat):
+    return {'type': 'Point', 'coordinates': [lng, lat]}
+
+
+def geocode(city, state=None):
+    """GeoJSON point for a city name, or None when the gazetteer does not know it.
+
+    The state picks between same-named cities (Aurangabad, Bilaspur, ...).
+    """
+    entries = (_gazetteer or _load()).get(city_key(city))
+    if not entries:
+        return None
+    state = city_key(state)
+    _, lng, lat, _ = next((e for e in entries if e[0] == state), entries[0])
+    return point(lng, lat)
+
+
+def city_names():
+    """Display names of every gazetteer city, for form suggestions."""
+    return sorted({entry[3] for entries in (_gazetteer or _load()).values() for entry in entries})
+
+
+def within_filter(center, km):
+    """Query fragment for colleges within ``km`` of a point (uses the 2dsphere index)."""
+    return {'geo': {'$geoWithin': {'$centerSphere': [center['coordinates'], km / EARTH_RADIUS_KM]}}}
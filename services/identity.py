@@ -0,0 +1,85 @@
+"""Request-scoped identity loader.
+
+The logged-in user's ``users`` document (without the password hash) and, for
+students, their ``students`` document are fetched at most once per request
+and kept on ``g``. A short-TTL process cache also lets consecutive requests
+from the same session skip the lookup. Writes to a user or student
+document must call invalidate() so this worker never serves stale data.
+"""
+import threading
+import time
+
+from bson import ObjectId
+from bson.errors import InvalidId
+from flask import g, session
+
+from config import Config
+from services.db import get_db
+
+USER_PROJECTION = {'password': 0}
+
+_cache = {}  # user_id -> (user, student, stored_at)
+_cache_lock = threading.Lock()
+_MISSING = object()
+
+
+def _cached(user_id):
+    ttl = Config.IDENTITY_CACHE_TTL
+    if not ttl:
+        return None
+    with _cache_lock:
+        entry = _cache.get(user_id)
+    if entry and time.monotonic() - entry[2] <= ttl:
+        return entry
+    return None
+
+
+def _store(user_id, user, student):
+    if not Config.IDENTITY_CACHE_TTL:
+        return
+    with _cache_lock:
+        if len(_cache) > 10000:
+            _cache.clear()
+        _cache[user_id] = (user, student, time.monotonic())
+
+
+def current_user():
+    """The logged-in user's document, or None."""
+    if 'current_user' not in g:
+        user_id = session.get('user_id')
+        user = None
+        entry = _cached(user_id) if user_id else None
+        if entry:
+            user = entry[0]
+            if entry[1] is not _MISSING:
+                g.current_student = entry[1]
+        elif user_id:
+            try:
+                user = get_db().users.find_one({'_id': ObjectId(user_id)}, USER_PROJECTION)
+            except InvalidId:
+                user = None
+            _store(user_id, user, g.get('current_student', _MISSING))
+        g.current_user = user
+    return g.current_user
+
+
+def current_student():
+    """The logged-in student's ``students`` document, or None."""
+    if 'current_student' not in g:
+        current_user()  # may fill g.current_student from the process cache
+    if 'current_student' not in g:
+        user_id = session.get('user_id')
+        g.current_student = get_db().students.find_one({'user_id': user_id}) if user_id else None
+        if user_id:
+            _store(user_id, g.current_user, g.current_student)
+    return g.current_student
+
+
+def invalidate(user_id=None):
+    """Forget cached identity data for a user (default: the current one)."""
+    user_id = str(user_id or session.get('user_id'))
+    with _cache_lock:
+        _cache.pop(user_id, None)
+    if user_id == session.get('user_id'):
+        g.pop('current_user', None)
+        g.pop('current_student', None)
@@ -0,0 +1,144 @@
+"""College image upload pipeline.
+
+Uploads are stored under a content-hash filename, so identical uploads
+dedupe to one file. Each upload is decoded once in a background worker pool,
+which writes resized WebP variants (card thumbnail and hero) next to the
+original. Templates use ``image_url(name, 'thumb')``, which falls back to the
+original until the variant exists.
+"""
+import hashlib
+import io
+import os
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+import click
+from flask import current_app
+from PIL import Image, ImageOps, UnidentifiedImageError
+
+from services.assets import asset_url
+
+IMAGE_DIR = os.path.join('static', 'image')
+VARIANT_DIR = 'variants'
+
+# name -> (max width, max height)
+VARIANTS = {
+    'thumb': (480, 320),
+    'hero': (1600, 900),
+}
+WEBP_QUALITY = 80
+
+_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix='image-variants')
+_known_variants = set()
+_pending = set()
+_known_lock = threading.Lock()
+
+
+def variant_name(filename, variant):
+    stem = os.path.splitext(filename)[0]
+    return '%s/%s-%s.webp' % (VARIANT_DIR, stem, variant)
+
+
+def _image_dir(root_path):
+    return os.path.join(root_path, IMAGE_DIR)
+
+
+def build_variants(image_dir, filename, data=None):
+    """Decode an image once and write every missing variant. Returns names written."""
+    targets = {variant: os.path.join(image_dir, variant_name(filename, variant)) for variant in VARIANTS}
+    missing = {variant: path for variant, path in targets.items() if not os.path.exists(path)}
+    if missing:
+        if data is None:
+            with open(os.path.join(image_dir, filename), 'rb') as fh:
+                data = fh.read()
+        with Image.open(io.BytesIO(data)) as img:
+            img = ImageOps.exif_transpose(img)
+            img = img.convert('RGBA' if img.mode in ('RGBA', 'LA', 'P') else 'RGB')
+            os.makedirs(os.path.join(image_dir, VARIANT_DIR), exist_ok=True)
+            for variant, path in missing.items():
+                resized = img.copy()
+                resized.thumbnail(VARIANTS[variant], Image.LANCZOS)
+                tmp_path = '%s.%s.tmp' % (path, uuid.uuid4().hex)
+                resized.save(tmp_path, 'WEBP', quality=WEBP_QUALITY, method=4)
+                os.replace(tmp_path, path)  # never expose a half-written file
+    with _known_lock:
+        _known_variants.update(variant_name(filename, variant) for variant in targets)
+    return list(missing)
+
+
+def _build_variants_logged(app, image_dir, filename, data):
+    try:
+        build_variants(image_dir, filename, data)
+    except (OSError, UnidentifiedImageError) as exc:
+        app.logger.warning('Could not build image variants for %s: %s', filename, exc)
+    finally:
+        with _known_lock:
+            _pending.discard(filename)
+
+
+def save_upload(file_storage):
+    """Store an uploaded image under its content hash and queue its variants.
+
+    Returns the stored filename, or None when the upload is not a readable
+    image.
+    """
+    data = file_storage.read()
+    try:
+        with Image.open(io.BytesIO(data)) as img:
+            img.verify()  # header/structure check only; full decode runs in the worker
+            fmt = (img.format or '').lower()
+    except (UnidentifiedImageError, Image.DecompressionBombError, OSError, SyntaxError):
+        return None
+
+    ext = {'jpeg': 'jpg'}.get(fmt, fmt) or 'jpg'
+    filename = '%s.%s' % (hashlib.sha256(data).hexdigest()[:32], ext)
+    image_dir = _image_dir(current_app.root_path)
+    path = os.path.join(image_dir, filename)
+    if not os.path.exists(path):
+        tmp_path = '%s.%s.tmp' % (path, uuid.uuid4().hex)
+        with open(tmp_path, 'wb') as fh:
+            fh.write(data)
+        os.replace(tmp_path, path)
+
+    # Identical uploads share one background job.
+    with _known_lock:
+        queue = filename not in _pending
+        _pending.add(filename)
+    if queue:
+        app = current_app._get_current_object()
+        _executor.submit(_build_variants_logged, app, image_dir, filename, data)
+    return filename
+
+
+def image_url(filename, variant=None):
+    """Static URL for an image, preferring the requested variant when built."""
+    if variant and filename:
+        name = variant_name(filename, variant)
+        with _known_lock:
+            known = name in _known_variants
+        if not known and os.path.exists(os.path.join(_image_dir(current_app.root_path), name)):
+            with _known_lock:
+                _known_variants.add(name)
+            known = True
+        if known:
+            return asset_url('image/' + name)
+    return asset_url('image/' + (filename or ''))
+
+
+def init_app(app):
+    app.add_template_global(image_url)
+
+    @app.cli.command('build-image-variants')
+    def build_image_variants_command():
+        """Generate thumbnail/hero variants for every image in static/image."""
+        image_dir = _image_dir(app.root_path)
+        built = 0
+        for filename in sorted(os.listdir(image_dir)):
+            if not os.path.isfile(os.path.join(image_dir, filename)):
+                continue
+            try:
+                built += len(build_variants(image_dir, filename))
+            except (OSError, UnidentifiedImageError) as exc:
+                click.echo('skipped %s: %s' % (filename, exc))
+        click.echo('%d variants written' % built)
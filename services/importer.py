@@ -0,0 +1,201 @@
+"""Streaming bulk import of colleges (``flask import-colleges``).
+
+Rows are streamed from a CSV or NDJSON file through a generator pipeline:
+read, then normalize to the document shape admin.create_college writes,
+then batch. Each batch costs three round trips: a bulk_write of colleges
+upserted by college_name, one _id lookup, and a bulk_write of course
+upserts. Memory stays flat for files of any size. Progress is checkpointed
+after every batch, so an interrupted load can be resumed with --resume.
+"""
+import csv
+import itertools
+import json
+import math
+import os
+import time
+
+import click
+from pymongo import UpdateOne
+
+from services.catalog import normalize_course
+from services.colleges import college_repository
+from services.db import get_client
+from services.keys import college_keys
+
+STRING_FIELDS = ('college_name', 'city', 'state', 'college_website', 'exam', 'cutoff', 'description', 'image')
+LIST_FIELDS = ('facilities', 'courses')
+
+
+class RowError(ValueError):
+    pass
+
+
+def _json_row(line, line_no):
+    try:
+        row = json.loads(line)
+    except ValueError as exc:
+        return RowError('line %d: invalid JSON: %s' % (line_no, exc))
+    if not isinstance(row, dict):
+        return RowError('line %d: not a JSON object' % line_no)
+    return row
+
+
+def read_rows(path, fmt):
+    """Yield raw row dicts from a CSV or NDJSON file, one line at a time.
+
+    Unparseable NDJSON lines are yielded as RowError instances, which
+    normalize_row rejects, so one bad line does not end the import.
+    """
+    with open(path, newline='', encoding='utf-8') as fh:
+        if fmt == 'csv':
+            yield from csv.DictReader(fh)
+        else:
+            for line_no, line in enumerate(fh, 1):
+                line = line.strip()
+                if line:
+                    yield _json_row(line, line_no)
+
+
+def _number(value, cast, field):
+    if value is None or value == '':
+        return None
+    try:
+        number = cast(float(value)) if cast is int else cast(value)
+    except (TypeError, ValueError, OverflowError):
+        raise RowError('%s: not a number: %r' % (field, value))
+    if not math.isfinite(number):
+        raise RowError('%s: not a finite number: %r' % (field, value))
+    return number
+
+
+def _list(value):
+    if isinstance(value, list):
+        items = value
+    else:
+        items = (value or '').split(',')
+    return [str(item).strip() for item in items if str(item).strip()]
+
+
+def normalize_row(row):
+    """Map a raw row to the college document admin.create_college produces."""
+    if isinstance(row, RowError):
+        raise row
+    doc = {}
+    for field in STRING_FIELDS:
+        value = row.get(field)
+        doc[field] = str(value).strip() if value not in (None, '') else None
+    if not doc['college_name']:
+        raise RowError('college_name is required')
+    doc['ranking'] = _number(row.get('ranking'), int, 'ranking')
+    doc['avg_fee'] = _number(row.get('avg_fee'), float, 'avg_fee')
+    doc['placement_rating'] = _number(row.get('placement_rating'), float, 'placement_rating')
+    doc['facilities'] = _list(row.get('facilities'))
+    doc['courses'] = list(dict.fromkeys(normalize_course(c) for c in _list(row.get('courses'))))
+    if not doc['image']:
+        del doc['image']  # keep an already uploaded image when re-importing
+    doc.update(college_keys(doc))
+    return doc
+
+
+def _batches(iterable, size):
+    iterator = iter(iterable)
+    while True:
+        batch = list(itertools.islice(iterator, size))
+        if not batch:
+            return
+        yield batch
+
+
+def write_batch(db, docs):
+    """Upsert one batch of college docs and their courses; returns (inserted, updated)."""
+    # Last row wins when a name repeats inside a batch.
+    by_name = {doc['college_name']: doc for doc in docs}
+    result = db.colleges.bulk_write(
+        [UpdateOne({'college_name': name}, {'$set': doc}, upsert=True) for name, doc in by_name.items()],
+        ordered=False)
+
+    ids = {doc['college_name']: doc['_id'] for doc in db.colleges.find(
+        {'college_name': {'$in': list(by_name)}}, {'college_name': 1})}
+    course_ops = [UpdateOne({'college_id': ids[name], 'course_name': course},
+                            {'$setOnInsert': {'college_id': ids[name], 'course_name': course}},
+                            upsert=True)
+                  for name, doc in by_name.items() if name in ids
+                  for course in dict.fromkeys(doc['courses'])]
+    if course_ops:
+        db.courses.bulk_write(course_ops, ordered=False)
+    return result.upserted_count, result.matched_count
+
+
+def _load_state(state_file, path):
+    if state_file and os.path.exists(state_file):
+        with open(state_file) as fh:
+            state = json.load(fh)
+        if state.get('path') == os.path.abspath(path):
+            return state.get('rows_done', 0)
+    return 0
+
+
+def _save_state(state_file, path, rows_done):
+    if not state_file:
+        return
+    tmp_path = state_file + '.tmp'
+    with open(tmp_path, 'w') as fh:
+        json.dump({'path': os.path.abspath(path), 'rows_done': rows_done}, fh)
+    os.replace(tmp_path, state_file)
+
+
+def import_colleges(db, path, fmt, batch_size=1000, resume=False, state_file=None, log=None):
+    """Import a file; returns a summary dict with counts and throughput."""
+    skip = _load_state(state_file, path) if resume else 0
+    started = time.monotonic()
+    stats = {'rows': skip, 'inserted': 0, 'updated': 0, 'rejected': 0, 'skipped': skip}
+
+    rows = itertools.islice(read_rows(path, fmt), skip, None)
+    line_no = skip
+    try:
+        for raw_batch in _batches(rows, batch_size):
+            docs = []
+            for raw in raw_batch:
+                line_no += 1
+                try:
+                    docs.append(normalize_row(raw))
+                except RowError as exc:
+                    stats['rejected'] += 1
+                    if log:
+                        log('row %d rejected: %s' % (line_no, exc))
+            if docs:
+                inserted, updated = write_batch(db, docs)
+                stats['inserted'] += inserted
+                stats['updated'] += updated
+            stats['rows'] += len(raw_batch)
+            _save_state(state_file, path, stats['rows'])
+            if log:
+                elapsed = time.monotonic() - started
+                log('%d rows (%.0f rows/s)' % (stats['rows'], (stats['rows'] - skip) / elapsed if elapsed else 0))
+    finally:
+        # Rebuild derived college data, also for the batches written before a
+        # failure (see services.colleges for other workers)
+        college_repository.reloaded(db)
+
+    elapsed = time.monotonic() - started
+    stats['seconds'] = round(elapsed, 3)
+    stats['rows_per_second'] = round((stats['rows'] - skip) / elapsed, 1) if elapsed else None
+    return stats
+
+
+def init_app(app):
+    @app.cli.command('import-colleges')
+    @click.argument('path', type=click.Path(exists=True, dir_okay=False))
+    @click.option('--format', 'fmt', type=click.Choice(['csv', 'ndjson']), default=None,
+                  help='Input format (default: from the file extension).')
+    @click.option('--batch-size', type=int, default=1000, show_default=True)
+    @click.option('--resume', is_flag=True, help='Skip rows committed by a previous run.')
+    @click.option('--state-file', default=None, help='Progress checkpoint file (default: PATH.progress).')
+    def import_colleges_command(path, fmt, batch_size, resume, state_file):
+        """Stream colleges and their courses from a CSV or NDJSON file."""
+        fmt = fmt or ('csv' if path.lower().endswith('.csv') else 'ndjson')
+        state_file = state_file or path + '.progress'
+        db = get_client().get_default_database()
+        stats = import_colleges(db, path, fmt, batch_size=batch_size, resume=resume,
+                                state_file=state_file, log=click.echo)
+        click.echo(json.dumps(stats))
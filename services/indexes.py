@@ -0,0 +1,161 @@
+"""Index declarations and index advisor.
+
+Every index the routes rely on is declared here and created idempotently at
+startup (see Config.ENSURE_INDEXES) or with ``flask ensure-indexes``.
+``flask index-report`` explains the queries the routes issue and lists the
+ones that still fall back to a collection scan.
+"""
+import click
+from flask import current_app
+from pymongo import ASCENDING, GEOSPHERE, TEXT, IndexModel
+from pymongo.errors import OperationFailure, PyMongoError
+
+from services.db import get_client
+from services.geo import geocode, within_filter
+from services.search import SEARCH_WEIGHTS
+
+INDEXES = {
+    'users': [
+        IndexModel([('email', ASCENDING)], name='email_unique', unique=True),
+    ],
+    'students': [
+        IndexModel([('user_id', ASCENDING)], name='user_id'),
+    ],
+    'colleges': [
+        IndexModel([('college_name', ASCENDING)], name='college_name'),
+        IndexModel([('city', ASCENDING)], name='city'),
+        IndexModel([('state', ASCENDING)], name='state'),
+        IndexModel([('exam', ASCENDING)], name='exam'),
+        IndexModel([('placement_rating', ASCENDING)], name='placement_rating'),
+        IndexModel([('avg_fee', ASCENDING)], name='avg_fee'),
+        IndexModel([('geo', GEOSPHERE)], name='geo'),
+        IndexModel([(field, TEXT) for field in SEARCH_WEIGHTS], name='college_search',
+                   weights=SEARCH_WEIGHTS, default_language='english'),
+    ],
+    'courses': [
+        IndexModel([('course_name', ASCENDING), ('college_id', ASCENDING)], name='course_name_college_id'),
+        # Unique per college; college_id first so course sync can read a
+        # college's courses from the same index. Partial, because legacy
+        # documents (a comma-separated "courses" string, read by the course
+        # catalog) have neither field and would all collide as (null, null).
+        IndexModel([('college_id', ASCENDING), ('course_name', ASCENDING)], name='college_id_course_name',
+                   unique=True, partialFilterExpression={'college_id': {'$exists': True},
+                                                         'course_name': {'$exists': True}}),
+    ],
+}
+
+# Representative queries issued by the routes: (route, collection, filter, sort).
+ROUTE_QUERIES = [
+    ('auth.login', 'users', {'email': 'someone@example.com'}, None),
+    ('auth.register', 'users', {'email': 'someone@example.com'}, None),
+    ('user.recommendations', 'students', {'user_id': '000000000000000000000000'}, None),
+    ('college.profile', 'colleges', {'college_name': 'Example College'}, None),
+    ('college.list_colleges', 'colleges', {'$text': {'$search': 'engineering'}}, None),
+    ('college.list_colleges', 'colleges', {'city': 'Pune'}, None),
+    ('college.list_colleges', 'colleges', {'state': 'Maharashtra'}, None),
+    ('college.list_colleges', 'colleges', {'exam': 'JEE'}, None),
+    ('college.list_colleges', 'colleges', {'placement_rating': {'$gte': 4}}, None),
+    ('college.list_colleges', 'colleges', {'avg_fee': {'$gte': 0, '$lte': 200000}}, None),
+    ('college.list_colleges', 'colleges', within_filter(geocode('Pune'), 50), None),
+    ('admin.edit_college', 'courses', {'college_id': None}, None),
+]
+
+
+class UniqueIndexError(Exception):
+    """A unique index could not be built, so its guarantee does not hold."""
+
+
+def ensure_indexes(db):
+    """Create all declared indexes; returns {collection: [created names]}.
+
+    Each index is built on its own, so one failure does not block the rest.
+    A failed plain index is logged and reported. A failed unique index
+    (e.g. duplicate emails) raises UniqueIndexError once every other index
+    has been attempted: writes rely on it, so it must not fail silently.
+    """
+    created = {}
+    failed_unique = []
+    for collection, models in INDEXES.items():
+        created[collection] = []
+        for model in models:
+            name = model.document['name']
+            try:
+                created[collection] += db[collection].create_indexes([model])
+            except OperationFailure as exc:
+                if model.document.get('unique'):
+                    current_app.logger.error('Could not create unique index %s.%s: %s', collection, name, exc)
+                    failed_unique.append('%s.%s: %s' % (collection, name, exc))
+                else:
+                    current_app.logger.warning('Could not create index %s.%s: %s', collection, name, exc)
+                created[collection].append('error: %s: %s' % (name, exc))
+    if failed_unique:
+        raise UniqueIndexError('Unique indexes not built: ' + '; '.join(failed_unique))
+    return created
+
+
+def _plan_stages(plan):
+    """Yield every stage name in an explain() query plan tree."""
+    if not isinstance(plan, dict):
+        return
+    if 'stage' in plan:
+        yield plan['stage']
+    for key in ('inputStage', 'queryPlan'):
+        if key in plan:
+            yield from _plan_stages(plan[key])
+    for child in plan.get('inputStages', []):
+        yield from _plan_stages(child)
+
+
+def explain_route_queries(db, queries=ROUTE_QUERIES):
+    """Explain each route query; returns a list of report rows."""
+    report = []
+    for route, collection, query, sort in queries:
+        command = {'find': collection, 'filter': query}
+        if sort:
+            command['sort'] = sort
+        explain = db.command('explain', command, verbosity='queryPlanner')
+        winning = explain.get('queryPlanner', {}).get('winningPlan', {})
+        stages = list(_plan_stages(winning))
+        report.append({
+            'route': route,
+            'collection': collection,
+            'filter': query,
+            'stages': stages,
+            'collscan': 'COLLSCAN' in stages,
+        })
+    return report
+
+
+def init_app(app):
+    """Register the index CLI commands and optionally build indexes now."""
+
+    @app.cli.command('ensure-indexes')
+    def ensure_indexes_command():
+        """Create all declared MongoDB indexes."""
+        db = get_client().get_default_database()
+        try:
+            created = ensure_indexes(db)
+        except UniqueIndexError as exc:
+            raise click.ClickException(str(exc))
+        for collection, names in created.items():
+            click.echo('%s: %s' % (collection, ', '.join(names)))
+
+    @app.cli.command('index-report')
+    def index_report_command():
+        """List route queries that still use a collection scan."""
+        db = get_client().get_default_database()
+        report = explain_route_queries(db)
+        for row in report:
+            status = 'COLLSCAN' if row['collscan'] else 'ok'
+            click.echo('%-8s %-24s %-10s %s' % (status, row['route'], row['collection'], row['filter']))
+        scans = sum(1 for row in report if row['collscan'])
+        click.echo('%d of %d queries fall back to COLLSCAN' % (scans, len(report)))
+
+    if app.config.get('ENSURE_INDEXES'):
+        with app.app_context():
+            # A UniqueIndexError is not caught: the app refuses to start
+            # without the unique guarantees its writes rely on.
+            try:
+                ensure_indexes(get_client().get_default_database())
+            except PyMongoError as exc:
+                app.logger.warning('Skipping index bootstrap, MongoDB unavailable: %s', exc)
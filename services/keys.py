@@ -0,0 +1,83 @@
+"""Normalized match keys for colleges and students.
+
+Recommendation matching compares these keys instead of free text:
+
+* ``course_key('B. Tech ')`` -> ``'btech'``: casefolded, with everything
+  that is not a letter or digit removed.
+* ``canonical_city_key(' Navi-Mumbai')`` -> ``'navi mumbai'``: casefolded,
+  with punctuation turned into single spaces. Known alternate names map to
+  the gazetteer's main name ('Bangalore' -> 'bengaluru').
+
+Every write path stores them on the document: ``course_keys`` and
+``city_key`` on colleges, ``course_key`` and ``city_key`` on students. Both
+also get a ``geo`` GeoJSON point from the bundled gazetteer (services.geo),
+or None for unknown cities. The recommendation snapshot can then build
+exact-match posting lists from them. Colleges also store
+``description_excerpt``, the start of the description that card views
+project instead of the full text (models.SUMMARY_PROJECTION). ``flask
+backfill-keys`` fills all of them in on documents written before they
+existed.
+"""
+import click
+from pymongo import UpdateOne
+
+from models import DESCRIPTION_EXCERPT
+from services.db import get_client
+from services.geo import NON_ALNUM, canonical_city_key, geocode
+
+
+def course_key(name):
+    return NON_ALNUM.sub('', name).casefold() if isinstance(name, str) else ''
+
+
+def college_keys(doc):
+    """Keys (and the card excerpt) to $set on a college document.
+
+    "location" stands in for "city" on auth-registered colleges.
+    """
+    courses = doc.get('courses') or []
+    if isinstance(courses, str):
+        courses = courses.split(',')
+    city = doc.get('city') or doc.get('location')
+    return {
+        'course_keys': sorted({key for key in map(course_key, courses) if key}),
+        'city_key': canonical_city_key(city),
+        'geo': geocode(city, doc.get('state')),
+        'description_excerpt': (doc.get('description') or '')[:DESCRIPTION_EXCERPT],
+    }
+
+
+def student_keys(doc):
+    return {
+        'course_key': course_key(doc.get('desired_course')),
+        'city_key': canonical_city_key(doc.get('location_pref')),
+        'geo': geocode(doc.get('location_pref')),
+    }
+
+
+def backfill(db, batch_size=1000):
+    """Recompute the stored keys of every college and student; returns counts."""
+    counts = {}
+    for collection, fields, keys in (
+            ('colleges', {'courses': 1, 'city': 1, 'location': 1, 'state': 1, 'description': 1}, college_keys),
+            ('students', {'desired_course': 1, 'location_pref': 1}, student_keys)):
+        ops = []
+        counts[collection] = 0
+        for doc in db[collection].find({}, fields):
+            ops.append(UpdateOne({'_id': doc['_id']}, {'$set': keys(doc)}))
+            if len(ops) >= batch_size:
+                counts[collection] += db[collection].bulk_write(ops, ordered=False).modified_count
+                ops = []
+        if ops:
+            counts[collection] += db[collection].bulk_write(ops, ordered=False).modified_count
+    return counts
+
+
+def init_app(app):
+    @app.cli.command('backfill-keys')
+    @click.option('--batch-size', type=int, default=1000, show_default=True)
+    def backfill_keys_command(batch_size):
+        """Store normalized course/city keys, geo points and card excerpts on existing documents."""
+        db = get_client().get_default_database()
+        for collection, modified in backfill(db, batch_size).items():
+            click.echo('%s: %d updated' % (collection, modified))
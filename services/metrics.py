@@ -0,0 +1,203 @@
+"""Request and MongoDB command metrics in Prometheus text format.
+
+``command_metrics`` is a pymongo CommandListener attached to the shared
+client. It records a duration histogram per command and collection, counts
+the commands each request issues, and logs any command slower than
+SLOW_QUERY_MS together with the endpoint that ran it. Before/after request
+hooks record per-endpoint latency and query-count histograms. Everything is
+rendered by ``render()`` for the admin-only ``/admin/metrics`` endpoint.
+Counters are per worker process.
+"""
+import logging
+import threading
+import time
+
+from flask import g, has_request_context, request
+from pymongo.monitoring import CommandListener
+
+from services.db import register_listener
+
+log = logging.getLogger(__name__)
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100)
+# Monitoring chatter that would only drown out the real queries.
+IGNORED_COMMANDS = {'hello', 'ismaster', 'isMaster', 'ping', 'saslStart', 'saslContinue',
+                    'endSessions', 'buildinfo', 'buildInfo', 'getnonce'}
+
+
+class Histogram:
+    def __init__(self, name, help_text, buckets, label_names):
+        self.name = name
+        self.help_text = help_text
+        self.buckets = buckets
+        self.label_names = label_names
+        self._series = {}  # label values -> [bucket counts..., sum, count]
+        self._lock = threading.Lock()
+
+    def observe(self, value, *labels):
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [0] * (len(self.buckets) + 2)
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[i] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    def reset(self):
+        with self._lock:
+            self._series.clear()
+
+    def render(self):
+        lines = ['# HELP %s %s' % (self.name, self.help_text), '# TYPE %s histogram' % self.name]
+        with self._lock:
+            series = sorted(self._series.items())
+        for labels, values in series:
+            base = ['%s="%s"' % (name, _escape(value)) for name, value in zip(self.label_names, labels)]
+            for bound, count in zip(self.buckets, values):
+                lines.append('%s_bucket{%s} %d' % (self.name, ','.join(base + ['le="%s"' % bound]), count))
+            lines.append('%s_bucket{%s} %d' % (self.name, ','.join(base + ['le="+Inf"']), values[-1]))
+            lines.append('%s_sum{%s} %s' % (self.name, ','.join(base), _number(values[-2])))
+            lines.append('%s_count{%s} %d' % (self.name, ','.join(base), values[-1]))
+        return lines
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _number(value):
+    return repr(float(value))
+
+
+def _gauge(name, help_text, value, kind='gauge'):
+    return ['# HELP %s %s' % (name, help_text), '# TYPE %s %s' % (name, kind), '%s %s' % (name, _number(value))]
+
+
+def _shape(command_name, command):
+    """Collection and the top-level filter keys of a command (never the values)."""
+    collection = command.get(command_name)
+    collection = collection if isinstance(collection, str) else ''
+    spec = command.get('filter') or command.get('query') or {}
+    if command_name == 'aggregate':
+        keys = [next(iter(stage), '') for stage in command.get('pipeline', []) if isinstance(stage, dict)]
+    else:
+        keys = sorted(spec) if isinstance(spec, dict) else []
+    return collection, keys
+
+
+class _RequestQueryCount:
+    """Commands issued by one request, possibly from several fan-out threads."""
+
+    __slots__ = ('value', '_lock')
+
+    def __init__(self):
+        self.value = 0
+        self._lock = threading.Lock()
+
+    def incr(self):
+        with self._lock:
+            self.value += 1
+
+
+class CommandMetrics(CommandListener):
+    def __init__(self, slow_ms=100):
+        self.slow_ms = slow_ms
+        self.commands = Histogram('studyway_mongo_command_seconds', 'MongoDB command duration.',
+                                  LATENCY_BUCKETS, ('command', 'collection'))
+        self.failures = {}  # command -> count
+        self.slow = 0
+        self._started = {}  # (connection, request_id) -> (collection, filter keys)
+        self._lock = threading.Lock()
+
+    def started(self, event):
+        if event.command_name in IGNORED_COMMANDS:
+            return
+        shape = _shape(event.command_name, event.command)
+        with self._lock:
+            self._started[(event.connection_id, event.request_id)] = shape
+        if has_request_context():
+            counter = g.get('mongo_queries')
+            if counter is not None:
+                counter.incr()
+
+    def _finished(self, event, failed):
+        with self._lock:
+            shape = self._started.pop((event.connection_id, event.request_id), None)
+            if failed:
+                self.failures[event.command_name] = self.failures.get(event.command_name, 0) + 1
+        if shape is None:
+            return
+        collection, keys = shape
+        seconds = event.duration_micros / 1e6
+        self.commands.observe(seconds, event.command_name, collection)
+        if seconds * 1000 >= self.slow_ms:
+            with self._lock:
+                self.slow += 1
+            log.warning('Slow query: %s %s keys=%s %.1fms endpoint=%s', event.command_name, collection,
+                        ','.join(keys), seconds * 1000, request.endpoint if has_request_context() else '-')
+
+    def succeeded(self, event):
+        self._finished(event, failed=False)
+
+    def failed(self, event):
+        self._finished(event, failed=True)
+
+    def render(self):
+        lines = self.commands.render()
+        lines += ['# HELP studyway_mongo_command_failures_total Failed MongoDB commands.',
+                  '# TYPE studyway_mongo_command_failures_total counter']
+        with self._lock:
+            failures = sorted(self.failures.items())
+            slow = self.slow
+        lines += ['studyway_mongo_command_failures_total{command="%s"} %d' % (_escape(name), count)
+                  for name, count in failures]
+        lines += _gauge('studyway_mongo_slow_commands_total',
+                        'Commands slower than the slow-query threshold.', slow, 'counter')
+        return lines
+
+
+command_metrics = CommandMetrics()
+request_latency = Histogram('studyway_request_seconds', 'Request latency by endpoint.',
+                            LATENCY_BUCKETS, ('endpoint', 'method', 'status'))
+request_queries = Histogram('studyway_request_mongo_commands', 'MongoDB commands issued per request.',
+                            QUERY_COUNT_BUCKETS, ('endpoint',))
+
+
+def _before_request():
+    g.request_started = time.perf_counter()
+    g.mongo_queries = _RequestQueryCount()
+
+
+def _after_request(response):
+    started = g.get('request_started')
+    if started is not None:
+        endpoint = request.endpoint or 'unmatched'
+        request_latency.observe(time.perf_counter() - started, endpoint, request.method, str(response.status_code))
+        counter = g.get('mongo_queries')
+        request_queries.observe(counter.value if counter is not None else 0, endpoint)
+    return response
+
+
+def render(extra=None, counters=None):
+    """All metrics as Prometheus text.
+
+    ``extra`` maps gauge names to (help, value). ``counters`` does the same
+    for values that only ever increase; their names must end in ``_total``.
+    """
+    lines = request_latency.render() + request_queries.render() + command_metrics.render()
+    for name, (help_text, value) in sorted((extra or {}).items()):
+        lines += _gauge(name, help_text, value)
+    for name, (help_text, value) in sorted((counters or {}).items()):
+        lines += _gauge(name, help_text, value, 'counter')
+    return '\n'.join(lines) + '\n'
+
+
+def init_app(app):
+    command_metrics.slow_ms = app.config.get('SLOW_QUERY_MS', command_metrics.slow_ms)
+    # Must be registered before the first get_client() call to be attached.
+    register_listener(command_metrics)
+    app.before_request(_before_request)
+    app.after_request(_after_request)
@@ -0,0 +1,135 @@
+"""Rendered-page cache for public pages.
+
+Anonymous GET responses of the endpoints in CACHED_ENDPOINTS are stored
+gzip-compressed with a strong ETag, keyed by endpoint and normalized query
+string. Repeat visitors get a 304 on If-None-Match. Everyone else gets the
+stored body without re-rendering Jinja or querying Mongo. Requests with any
+session state (logged in, pending flash messages) bypass the cache entirely.
+Pages that show college data belong to the 'colleges' group, which is
+dropped whenever a college is written.
+"""
+import functools
+import gzip
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+from flask import Response, make_response, request, session
+
+# endpoint -> invalidation group (None: only expires by TTL)
+CACHED_ENDPOINTS = {
+    'home': 'colleges',
+    'about': None,
+    'contact': None,
+    'college.list_colleges': 'colleges',
+}
+
+
+class PageCache:
+    def __init__(self, maxsize=512, ttl=300):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries = OrderedDict()  # key -> (group, etag, mimetype, gz_body, stored_at)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.not_modified = 0
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or (self.ttl and time.monotonic() - entry[4] > self.ttl):
+                self._entries.pop(key, None)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def put(self, key, group, body, mimetype):
+        etag = hashlib.sha1(body).hexdigest()
+        entry = (group, etag, mimetype, gzip.compress(body, compresslevel=6), time.monotonic())
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+        return entry
+
+    def record_not_modified(self):
+        with self._lock:
+            self.not_modified += 1
+
+    def invalidate(self, group=None):
+        """Drop every entry in ``group`` (all entries when group is None)."""
+        with self._lock:
+            if group is None:
+                self._entries.clear()
+            else:
+                for key in [k for k, entry in self._entries.items() if entry[0] == group]:
+                    del self._entries[key]
+
+    def stats(self):
+        with self._lock:
+            return {
+                'size': len(self._entries),
+                'maxsize': self.maxsize,
+                'ttl': self.ttl,
+                'hits': self.hits,
+                'misses': self.misses,
+                'not_modified': self.not_modified,
+            }
+
+
+page_cache = PageCache()
+
+
+def _cache_key():
+    args = sorted((k, v) for k, values in request.args.lists() for v in values if v.strip())
+    return (request.endpoint, tuple(args))
+
+
+def _cacheable_request():
+    return request.method == 'GET' and not session
+
+
+def _respond(entry):
+    _, etag, mimetype, gz_body, _ = entry
+    if etag in request.if_none_match:
+        page_cache.record_not_modified()
+        response = Response(status=304)
+    elif request.accept_encodings['gzip']:
+        response = Response(gz_body, mimetype=mimetype)
+        response.headers['Content-Encoding'] = 'gzip'
+    else:
+        response = Response(gzip.decompress(gz_body), mimetype=mimetype)
+    response.set_etag(etag)
+    response.vary.update(('Accept-Encoding', 'Cookie'))
+    response.headers['Cache-Control'] = 'public, no-cache'  # store, but revalidate via ETag
+    return response
+
+
+def cached(group, view):
+    @functools.wraps(view)
+    def wrapper(*args, **kwargs):
+        if not _cacheable_request():
+            return view(*args, **kwargs)
+        key = _cache_key()
+        entry = page_cache.get(key)
+        if entry is None:
+            response = make_response(view(*args, **kwargs))
+            # Rendering may have flashed a message or touched the session.
+            if response.status_code != 200 or response.direct_passthrough or session:
+                return response
+            entry = page_cache.put(key, group, response.get_data(), response.mimetype)
+        return _respond(entry)
+    return wrapper
+
+
+def init_app(app):
+    page_cache.maxsize = app.config.get('PAGE_CACHE_SIZE', page_cache.maxsize)
+    page_cache.ttl = app.config.get('PAGE_CACHE_TTL', page_cache.ttl)
+    for endpoint, group in CACHED_ENDPOINTS.items():
+        if endpoint in app.view_functions:
+            app.view_functions[endpoint] = cached(group, app.view_functions[endpoint])
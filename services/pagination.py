@@ -0,0 +1,148 @@
+"""Keyset (cursor) pagination for listing pages.
+
+Pages are walked on the ``_id`` index: the next page is ``_id > last`` and the
+previous page is ``_id < first``, so page 500 costs the same as page 1 instead
+of skipping over every earlier document. Page links carry an opaque cursor
+token rather than a page number. Totals come from a short-lived count cache
+(or the collection metadata when unfiltered) instead of an exact
+count_documents() on every request.
+
+Text-search results are ordered by relevance, which has no indexable key, so
+their tokens carry an offset instead; search result sets are small.
+"""
+import base64
+import json
+import threading
+import time
+
+from bson import ObjectId
+from bson.errors import InvalidId
+from pymongo import ASCENDING, DESCENDING
+
+from services.executor import query_executor
+from services.search import ranked_find
+
+COUNT_TTL = 60
+
+_count_cache = {}
+_count_lock = threading.Lock()
+
+
+def encode_token(**fields):
+    raw = json.dumps(fields, separators=(',', ':')).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+
+def decode_token(token):
+    """Decode a cursor token; None for a missing or tampered token."""
+    if not token:
+        return None
+    try:
+        raw = base64.urlsafe_b64decode(token + '=' * (-len(token) % 4))
+        fields = json.loads(raw)
+    except (ValueError, TypeError):
+        return None
+    return fields if isinstance(fields, dict) else None
+
+
+def cached_count(collection, query, ttl=COUNT_TTL):
+    """Document count for a listing, cached for ``ttl`` seconds per filter."""
+    if not query:
+        # Collection metadata; O(1) regardless of collection size.
+        return collection.estimated_document_count()
+    key = (collection.full_name, json.dumps(query, sort_keys=True, default=str))
+    now = time.monotonic()
+    with _count_lock:
+        hit = _count_cache.get(key)
+        if hit and now - hit[1] <= ttl:
+            return hit[0]
+    count = collection.count_documents(query)
+    with _count_lock:
+        if len(_count_cache) > 1000:
+            _count_cache.clear()
+        _count_cache[key] = (count, now)
+    return count
+
+
+class Page:
+    def __init__(self, items, number, per_page, total, next_token=None, prev_token=None):
+        self.items = items
+        self.number = number
+        self.per_page = per_page
+        self.total = total
+        self.next_token = next_token
+        self.prev_token = prev_token
+
+    @property
+    def total_pages(self):
+        return max(1, (self.total + self.per_page - 1) // self.per_page)
+
+
+def _with_key(query, condition):
+    if not query:
+        return {'_id': condition}
+    return {'$and': [query, {'_id': condition}]}
+
+
+def _int(value, default):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return default
+
+
+def _parse_id(value):
+    if not value:
+        return None  # ObjectId(None) would mint a fresh id
+    try:
+        return ObjectId(value)
+    except (InvalidId, TypeError):
+        return None
+
+
+def paginate(collection, query, per_page, token=None, projection=None):
+    """Return one Page of ``collection.find(query)`` for a cursor token.
+
+    The page query and the total count run concurrently.
+    """
+    cursor = decode_token(token) or {}
+
+    if '$text' in query:
+        offset = max(0, _int(cursor.get('o'), 0))
+        items, total = query_executor.gather(
+            lambda: list(ranked_find(collection, query, projection).skip(offset).limit(per_page + 1)),
+            lambda: cached_count(collection, query))
+        has_more = len(items) > per_page
+        items = items[:per_page]
+        number = offset // per_page + 1
+        next_token = encode_token(o=offset + per_page, p=number + 1) if has_more else None
+        prev_token = encode_token(o=max(0, offset - per_page), p=number - 1) if offset else None
+        return Page(items, number, per_page, total, next_token, prev_token)
+
+    key = _parse_id(cursor.get('k'))
+    backwards = key is not None and cursor.get('d') == 'prev'
+    number = max(1, _int(cursor.get('p'), 1)) if key is not None else 1
+
+    if key is None:
+        find_query, order = query, ASCENDING
+    elif backwards:
+        find_query, order = _with_key(query, {'$lt': key}), DESCENDING
+    else:
+        find_query, order = _with_key(query, {'$gt': key}), ASCENDING
+
+    items, total = query_executor.gather(
+        lambda: list(collection.find(find_query, projection).sort('_id', order).limit(per_page + 1)),
+        lambda: cached_count(collection, query))
+    has_more = len(items) > per_page
+    items = items[:per_page]
+    if backwards:
+        items.reverse()
+
+    has_next = has_more if not backwards else True
+    has_prev = has_more if backwards else key is not None
+    next_token = prev_token = None
+    if items and has_next:
+        next_token = encode_token(k=str(items[-1]['_id']), d='next', p=number + 1)
+    if items and has_prev and number > 1:
+        prev_token = encode_token(k=str(items[0]['_id']), d='prev', p=number - 1)
+    return Page(items, number, per_page, total, next_token, prev_token)
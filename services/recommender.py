@@ -1,19 +1,362 @@
-# Simple placeholder recommender. Replace with your ML pipeline.
-def recommend_colleges(user_profile, colleges):
-    # Very naive matching by budget and desired course keyword
-    desired_course = (user_profile.get("desired_course") or "").lower()
-    max_budget = user_profile.get("budget") or 10**12
-    location_pref = (user_profile.get("location_pref") or "").lower()
-    scored = []
-    for c in colleges:
-        score = 0
-        if desired_course and any(desired_course in (course or '').lower() for course in c.get('courses', [])):
-            score += 2
-        if location_pref and location_pref in (c.get('location') or '').lower():
-            score += 1
-        fees = c.get("avg_fee") or 0
-        if fees <= max_budget:
-            score += 1
-        scored.append((score, c))
-    scored.sort(key=lambda x: x[0], reverse=True)
-    return [c for _, c in scored[:20]]
+"""College recommendation engine.
+
+Colleges are kept in memory as a columnar snapshot: NumPy arrays for the
+numeric fields, and posting lists keyed by the normalized course and city
+keys (see services.keys). Recommendation is two-stage. Candidates are looked
+up in the posting lists for the student's course and city, and only those
+rows are scored. The whole catalog is scored in one vectorized pass only when
+the candidates cannot fill the top k on their own.
+"""
+import hashlib
+import itertools
+import json
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+from config import Config
+from models import SUMMARY_PROJECTION
+from services.geo import EARTH_RADIUS_KM, canonical_city_key
+from services.keys import college_keys, course_key, student_keys
+
+# Points awarded per matching criterion (same weights the recommendations
+# page has always used).
+COURSE_SCORE = 3
+LOCATION_SCORE = 2
+BUDGET_SCORE = 1
+CUTOFF_SCORE = 2
+# Location points decay with distance from the student's city: full points
+# for the same city or metro area, NEARBY_SCORE within NEARBY_KM.
+LOCAL_KM = 30
+NEARBY_KM = 150
+NEARBY_SCORE = 1
+
+DEFAULT_TOP_K = 20
+# Candidate retrieval is used while the course/city postings cover at most
+# this share of the snapshot; past that a full vectorized pass is cheaper.
+MAX_CANDIDATE_FRACTION = 0.05
+DEFAULT_IMAGE = 'default-college.jpg'
+# Card fields, the stored match keys and point, and "location", which
+# colleges registered via auth use instead of "city".
+SNAPSHOT_PROJECTION = dict(SUMMARY_PROJECTION, location=1, course_keys=1, city_key=1, geo=1)
+
+_generations = itertools.count(1)
+
+
+def to_float(value):
+    """Parse a number stored as int/float/str; NaN when missing or invalid."""
+    if value is None or value == '':
+        return np.nan
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return np.nan
+
+
+def fingerprint(doc, fields):
+    """Hash of ``doc``'s values for ``fields``, for spotting changed documents."""
+    raw = json.dumps({field: doc.get(field) for field in fields}, sort_keys=True, default=str)
+    return hashlib.sha1(raw.encode('utf-8')).hexdigest()
+
+
+def _haversine_km(geo, lng, lat):
+    """Distances from a GeoJSON point to arrays of radian coordinates (NaN stays NaN)."""
+    lng1, lat1 = np.radians(geo['coordinates'])
+    h = np.sin((lat - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat) * np.sin((lng - lng1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(h))
+
+
+class CollegeSnapshot:
+    """Immutable columnar view of the colleges collection."""
+
+    def __init__(self, colleges):
+        self.docs = list(colleges)
+        n = len(self.docs)
+        self.size = n
+
+        self.fee = np.fromiter((to_float(c.get('avg_fee')) for c in self.docs), dtype=float, count=n)
+        self.cutoff = np.fromiter((to_float(c.get('cutoff')) for c in self.docs), dtype=float, count=n)
+        self.rating = np.fromiter((to_float(c.get('placement_rating')) for c in self.docs), dtype=float, count=n)
+
+        # Posting lists: course/city key -> sorted array of college rows. Keys
+        # stored at write time are used as is; older documents get them computed.
+        # Points come from the gazetteer, so rows share a few hundred distinct
+        # points at most: each row stores a code into that list (-1: no point).
+        course_postings, city_postings = {}, {}
+        point_codes = {}  # (city key, lng, lat) -> code; same-named cities keep their own points
+        codes = np.full(n, -1, dtype=np.int32)
+        for row, college in enumerate(self.docs):
+            stored = all(field in college for field in ('course_keys', 'city_key', 'geo'))
+            keys = college if stored else college_keys(college)
+            for key in set(keys['course_keys']):
+                course_postings.setdefault(key, []).append(row)
+            if keys['city_key']:
+                city_postings.setdefault(keys['city_key'], []).append(row)
+            if keys['geo']:
+                lng, lat = keys['geo']['coordinates']
+                codes[row] = point_codes.setdefault((keys['city_key'], lng, lat), len(point_codes))
+        self.course_postings = {key: np.array(rows, dtype=np.int64) for key, rows in course_postings.items()}
+        self.city_postings = {key: np.array(rows, dtype=np.int64) for key, rows in city_postings.items()}
+        self.point_codes = codes
+        self.point_cities = [city for city, _, _ in point_codes]
+        self.point_lng = np.radians([lng for _, lng, _ in point_codes])
+        self.point_lat = np.radians([lat for _, _, lat in point_codes])
+
+        self.built_at = time.monotonic()
+        self.generation = next(_generations)
+
+    def _member(self, postings, key, rows):
+        posting = postings.get(key)
+        if rows is None:
+            mask = np.zeros(self.size, dtype=bool)
+            if posting is not None:
+                mask[posting] = True
+            return mask
+        if posting is None:
+            return np.zeros(rows.size, dtype=bool)
+        # Both are sorted row numbers: binary search instead of np.isin's sort.
+        found = np.searchsorted(posting, rows)
+        return posting[np.minimum(found, posting.size - 1)] == rows
+
+    def score(self, profile, rows=None):
+        """Score every college (or only ``rows``) for a student profile; returns an int array."""
+        scores = np.zeros(self.size if rows is None else rows.size, dtype=np.int32)
+        if not scores.size:
+            return scores
+
+        keys = student_keys(profile)
+        if keys['course_key']:
+            scores += COURSE_SCORE * self._member(self.course_postings, keys['course_key'], rows)
+        if keys['city_key']:
+            same_city = self._member(self.city_postings, keys['city_key'], rows)
+            if keys['geo']:
+                km = self._distance_km(keys['geo'], rows)
+                with np.errstate(invalid='ignore'):  # NaN: college has no point
+                    scores += np.where(same_city | (km <= LOCAL_KM), LOCATION_SCORE,
+                                       np.where(km <= NEARBY_KM, NEARBY_SCORE, 0)).astype(np.int32)
+            else:
+                scores += LOCATION_SCORE * same_city
+
+        fee = self.fee if rows is None else self.fee[rows]
+        cutoff = self.cutoff if rows is None else self.cutoff[rows]
+
+        budget = to_float(profile.get('budget'))
+        if budget:  # NaN and 0 both mean "no budget given"
+            # NaN/zero fees never count, matching the old truthiness check.
+            with np.errstate(invalid='ignore'):
+                scores += BUDGET_SCORE * ((fee > 0) & (fee <= budget))
+
+        academic = profile.get('academic_profile') or {}
+        cgpa = to_float(academic.get('graduation_cgpa'))
+        if not np.isnan(cgpa):
+            with np.errstate(invalid='ignore'):
+                scores += CUTOFF_SCORE * (cutoff <= cgpa)
+
+        return scores
+
+    def _distance_km(self, geo, rows=None):
+        # One distance per distinct point, then a lookup per row (NaN: no point).
+        km = np.append(_haversine_km(geo, self.point_lng, self.point_lat), np.nan)
+        return km[self.point_codes if rows is None else self.point_codes[rows]]
+
+    def nearby(self, center, km, limit=6, exclude=()):
+        """Rows within ``km`` of a GeoJSON point, nearest first, with their distances."""
+        distances = self._distance_km(center)
+        rows = np.flatnonzero(distances <= km)  # rows without a point are NaN
+        rows = rows[np.lexsort((rows, distances[rows]))]
+        exclude = set(exclude)
+        found = []
+        for row in rows:
+            if self.docs[row]['_id'] not in exclude:
+                found.append(row)
+                if len(found) == limit:
+                    break
+        found = np.array(found, dtype=np.int64)
+        return found, distances[found]
+
+    def _candidate_postings(self, profile):
+        """Posting lists of the student's course, city and cities within NEARBY_KM.
+
+        These are the only colleges that can earn course or location points.
+        """
+        keys = student_keys(profile)
+        cities = {keys['city_key']}
+        if keys['geo'] and self.point_cities:
+            km = _haversine_km(keys['geo'], self.point_lng, self.point_lat)
+            cities.update(city for city, d in zip(self.point_cities, km) if d <= NEARBY_KM)
+        found = [self.city_postings[city] for city in cities if city in self.city_postings]
+        if keys['course_key'] in self.course_postings:
+            found.append(self.course_postings[keys['course_key']])
+        return found
+
+    def _rank(self, rows, scores, k):
+        keep = scores > 0
+        rows, scores = rows[keep], scores[keep]
+        if k and rows.size > k:
+            # Partial selection first, so only the rows that can make the top k
+            # (everything tied with the k-th score included) are fully sorted.
+            kth = np.partition(scores, scores.size - k)[scores.size - k]
+            keep = scores >= kth
+            rows, scores = rows[keep], scores[keep]
+        rating = np.nan_to_num(self.rating[rows], nan=-1.0)
+        # Highest score first, then better placement rating, then catalog order.
+        order = np.lexsort((rows, -rating, -scores))[:k or None]
+        return rows[order], scores[order]
+
+    def top_k(self, profile, k=DEFAULT_TOP_K):
+        """The k best rows with a positive score, and their scores, best first.
+
+        When the student's course and city postings are selective, only those
+        candidates are scored. Their ranking is final once k of them beat
+        BUDGET_SCORE + CUTOFF_SCORE, the most any other college can get.
+        Otherwise the whole snapshot is scored in one pass, which is cheaper
+        than merging large posting lists anyway.
+        """
+        found = self._candidate_postings(profile)
+        matched = sum(rows.size for rows in found)
+        if k and k <= matched <= self.size * MAX_CANDIDATE_FRACTION:
+            rows = np.unique(np.concatenate(found)) if len(found) > 1 else found[0]
+            if rows.size >= k:
+                top, scores = self._rank(rows, self.score(profile, rows), k)
+                if top.size == k and scores[-1] > BUDGET_SCORE + CUTOFF_SCORE:
+                    return top, scores
+        return self._rank(np.arange(self.size), self.score(profile), k)
+
+
+def profile_key(profile):
+    """Canonical hash of the student fields that affect scoring."""
+    academic = profile.get('academic_profile') or {}
+    budget = to_float(profile.get('budget'))
+    cgpa = to_float(academic.get('graduation_cgpa'))
+    fields = {
+        'desired_course': course_key(profile.get('desired_course')),
+        'location_pref': canonical_city_key(profile.get('location_pref')),
+        'budget': None if np.isnan(budget) else budget,
+        'graduation_cgpa': None if np.isnan(cgpa) else cgpa,
+    }
+    raw = json.dumps(fields, sort_keys=True, separators=(',', ':'))
+    return hashlib.sha1(raw.encode('utf-8')).hexdigest()
+
+
+class RecommendationCache:
+    """Bounded LRU cache with per-entry TTL and hit/miss counters."""
+
+    def __init__(self, maxsize=1024, ttl=600):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                value, stored_at = entry
+                if not self.ttl or time.monotonic() - stored_at <= self.ttl:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._entries[key]
+            self.misses += 1
+            return None
+
+    def put(self, key, value):
+        if not self.maxsize:
+            return
+        with self._lock:
+            self._entries[key] = (value, time.monotonic())
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.invalidations += 1
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'size': len(self._entries),
+                'maxsize': self.maxsize,
+                'ttl': self.ttl,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_ratio': self.hits / lookups if lookups else 0.0,
+                'evictions': self.evictions,
+                'invalidations': self.invalidations,
+            }
+
+
+class RecommendationEngine:
+    """Holds the current college snapshot and rebuilds it when colleges change.
+
+    Writes in this process call invalidate(); the TTL bounds how long a
+    snapshot can lag writes made by other worker processes. Results are
+    cached per profile and per snapshot, so a rebuild never serves rows
+    computed against an older catalog.
+    """
+
+    def __init__(self, ttl=300, cache_size=1024, cache_ttl=600):
+        self.ttl = ttl
+        self.cache = RecommendationCache(cache_size, cache_ttl)
+        self._snapshot = None
+        self._stale = True
+        self._lock = threading.Lock()
+
+    def invalidate(self):
+        self._stale = True
+        self.cache.clear()
+
+    def _expired(self):
+        snapshot = self._snapshot
+        return (self._stale or snapshot is None
+                or (self.ttl and time.monotonic() - snapshot.built_at > self.ttl))
+
+    def snapshot(self, db):
+        if self._expired():
+            with self._lock:
+                if self._expired():
+                    # Clear the flag before reading so a write racing with the
+                    # rebuild marks the new snapshot stale again.
+                    self._stale = False
+                    self._snapshot = CollegeSnapshot(db.colleges.find({}, SNAPSHOT_PROJECTION))
+        return self._snapshot
+
+    def recommend(self, db, profile, k=DEFAULT_TOP_K):
+        snapshot = self.snapshot(db)
+        key = (snapshot.generation, k, profile_key(profile))
+        rows = self.cache.get(key)
+        if rows is None:
+            rows, _ = snapshot.top_k(profile, k)
+            self.cache.put(key, rows)
+        return [snapshot.docs[row] for row in rows]
+
+    def nearby(self, db, center, km, limit=6, exclude=()):
+        """Closest colleges to a point from the snapshot, with ``distance_km`` set."""
+        snapshot = self.snapshot(db)
+        rows, distances = snapshot.nearby(center, km, limit, exclude)
+        # Copies: snapshot documents are shared between requests.
+        return [dict(snapshot.docs[row], distance_km=round(float(d))) for row, d in zip(rows, distances)]
+
+
+engine = RecommendationEngine(
+    ttl=Config.RECOMMENDER_SNAPSHOT_TTL,
+    cache_size=Config.RECOMMENDATION_CACHE_SIZE,
+    cache_ttl=Config.RECOMMENDATION_CACHE_TTL,
+)
+
+
+def recommend_colleges(user_profile, colleges, k=DEFAULT_TOP_K):
+    """Rank an explicit list of colleges for a profile (no shared snapshot)."""
+    snapshot = CollegeSnapshot(colleges)
+    rows, _ = snapshot.top_k(user_profile, k)
+    return [snapshot.docs[row] for row in rows]
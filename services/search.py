@@ -0,0 +1,34 @@
+"""Ranked full-text search over colleges.
+
+Backed by the weighted ``college_search`` text index declared in
+services.indexes, so a search is an index lookup ranked by textScore rather
+than a regex scan over every document.
+"""
+MAX_QUERY_LENGTH = 100
+
+# Relative importance of each field in the text index.
+SEARCH_WEIGHTS = {'college_name': 10, 'name': 10, 'courses': 5, 'city': 2}
+
+SCORE_PROJECTION = {'score': {'$meta': 'textScore'}}
+SCORE_SORT = [('score', {'$meta': 'textScore'})]
+
+
+def normalize_query(search_query):
+    """Collapse whitespace and cap the length of user-supplied search text."""
+    return ' '.join((search_query or '').split())[:MAX_QUERY_LENGTH]
+
+
+def search_filter(search_query):
+    """Mongo filter clause for a free-text search ({} when there is none)."""
+    search_query = normalize_query(search_query)
+    if not search_query:
+        return {}
+    return {'$text': {'$search': search_query}}
+
+
+def ranked_find(collection, query, projection=None):
+    """find() that orders text-search hits by relevance."""
+    if '$text' not in query:
+        return collection.find(query, projection)
+    projection = dict(projection or {}, **SCORE_PROJECTION)
+    return collection.find(query, projection).sort(SCORE_SORT)
@@ -0,0 +1,269 @@
+"""Precomputed "similar colleges" neighbour table.
+
+Every college becomes a feature vector with these parts:
+
+* TF-IDF weights over its courses and facilities (normalized keys; the
+  MAX_TERMS most common terms), L2-normalized;
+* its avg_fee (log scale), ranking and placement_rating, min-max scaled
+  and centred, each weighted by NUMERIC_WEIGHT.
+
+Similarity is the cosine of two vectors. ``flask build-similar`` computes
+the top-k neighbours of every college with blocked NumPy matrix products
+and stores them in the ``similar_colleges`` collection (``_id`` =
+college id). The college page reads a single document.
+
+Runs are incremental unless ``--full`` is given. A per-college fingerprint
+of the feature fields finds new, changed and deleted colleges. Only these
+colleges get their lists recomputed:
+
+* the changed colleges themselves;
+* colleges whose stored list contains a changed or deleted college;
+* colleges that a changed college now beats the last stored entry of.
+
+``flask similar-colleges-worker`` runs incremental builds on an interval;
+that is the default way the table follows college writes. Every build
+reads all colleges and builds the full feature matrix (hundreds of MB at
+100k colleges), so it belongs in one worker process, not in web workers.
+For small catalogs, SIMILAR_REBUILD_DELAY >= 0 also has each college write
+schedule an incremental build in the writing process (``similar_rebuilds``,
+wired to the college events in services.colleges). It runs that many
+seconds later, so a burst of edits costs one build. IDF weights and
+numeric scaling drift slowly as the catalog changes. A periodic ``--full``
+run refreshes the lists that incremental runs leave alone.
+"""
+import json
+import logging
+import threading
+import time
+from collections import Counter
+from datetime import datetime, timezone
+
+import click
+import numpy as np
+from pymongo import DeleteMany, ReplaceOne
+
+from models import SUMMARY_PROJECTION
+from services.db import get_client
+from config import Config
+from services.keys import course_key
+from services.recommender import fingerprint, to_float
+
+log = logging.getLogger(__name__)
+
+FEATURE_FIELDS = ('courses', 'facilities', 'avg_fee', 'ranking', 'placement_rating')
+FEATURE_PROJECTION = {field: 1 for field in FEATURE_FIELDS}
+DEFAULT_K = 8
+MAX_TERMS = 512
+NUMERIC_WEIGHT = 0.35
+BLOCK_SIZE = 1024
+# Working memory per block of rows: similarities (float32) plus argpartition indexes (int64).
+BLOCK_BYTES = 64 * 1024 * 1024
+
+
+def _terms(college):
+    terms = set()
+    for prefix, field in (('c:', 'courses'), ('f:', 'facilities')):
+        values = college.get(field) or []
+        if isinstance(values, str):
+            values = values.split(',')
+        terms.update(prefix + key for key in map(course_key, values) if key)
+    return terms
+
+
+def _scaled(values):
+    """Min-max scale to [-0.5, 0.5]; missing values land on the median."""
+    values = np.array(values, dtype=float)
+    known = ~np.isnan(values)
+    if not known.any():
+        return np.zeros(values.size)
+    values[~known] = np.median(values[known])
+    low, high = values.min(), values.max()
+    if high == low:
+        return np.zeros(values.size)
+    return (values - low) / (high - low) - 0.5
+
+
+def feature_matrix(colleges):
+    """One L2-normalized float32 row per college."""
+    n = len(colleges)
+    terms = [_terms(college) for college in colleges]
+    df = Counter(term for college_terms in terms for term in college_terms)
+    vocab = {term: col for col, (term, _) in enumerate(df.most_common(MAX_TERMS))}
+
+    text = np.zeros((n, len(vocab)), dtype=np.float32)
+    for row, college_terms in enumerate(terms):
+        cols = [vocab[term] for term in college_terms if term in vocab]
+        text[row, cols] = 1.0
+    idf = np.log((1 + n) / (1 + np.array([df[term] for term in vocab], dtype=np.float32))) + 1
+    text *= idf
+    text /= np.maximum(np.linalg.norm(text, axis=1, keepdims=True), 1e-12)
+
+    fee = [np.log1p(v) if v >= 0 else np.nan for v in (to_float(c.get('avg_fee')) for c in colleges)]
+    numeric = np.column_stack([
+        _scaled(fee),
+        _scaled([to_float(c.get('ranking')) for c in colleges]),
+        _scaled([to_float(c.get('placement_rating')) for c in colleges]),
+    ]).astype(np.float32) * NUMERIC_WEIGHT
+
+    features = np.hstack([text, numeric])
+    features /= np.maximum(np.linalg.norm(features, axis=1, keepdims=True), 1e-12)
+    return features
+
+
+def top_k_neighbours(features, rows, k=DEFAULT_K, block_bytes=BLOCK_BYTES):
+    """Yield (row, neighbour rows, scores) for each of ``rows``, best first."""
+    n = features.shape[0]
+    k = min(k, n - 1)
+    if k <= 0:
+        for row in rows:
+            yield row, np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+        return
+    rows = np.asarray(rows, dtype=np.int64)
+    block_size = max(1, min(BLOCK_SIZE, block_bytes // (n * 16)))
+    for start in range(0, rows.size, block_size):
+        block = rows[start:start + block_size]
+        sims = features[block] @ features.T
+        sims[np.arange(block.size), block] = -np.inf  # never your own neighbour
+        part = np.argpartition(sims, n - k, axis=1)[:, n - k:]
+        part_sims = np.take_along_axis(sims, part, axis=1)
+        order = np.argsort(-part_sims, axis=1, kind='stable')
+        best = np.take_along_axis(part, order, axis=1)
+        best_sims = np.take_along_axis(part_sims, order, axis=1)
+        for i, row in enumerate(block):
+            yield row, best[i], best_sims[i]
+
+
+def _affected_rows(ids, features, stored, changed_rows, deleted, k):
+    """Rows whose stored list may change after the given college changes."""
+    todo = set(changed_rows)
+    changed_ids = {ids[row] for row in changed_rows} | deleted
+    # Best similarity of every college to any changed college, in bounded blocks.
+    best_new = None
+    if changed_rows:
+        best_new = np.full(len(ids), -np.inf, dtype=np.float32)
+        step = max(1, BLOCK_BYTES // (len(ids) * 4))
+        for start in range(0, len(changed_rows), step):
+            block = features[changed_rows[start:start + step]] @ features.T
+            np.maximum(best_new, block.max(axis=0), out=best_new)
+    for row, college_id in enumerate(ids):
+        if row in todo:
+            continue
+        doc = stored[college_id]
+        scores = doc.get('scores', [])
+        if changed_ids.intersection(doc.get('neighbours', [])):
+            todo.add(row)
+        elif best_new is not None and (len(scores) < k or best_new[row] > scores[-1]):
+            todo.add(row)
+    return sorted(todo)
+
+
+def build(db, full=False, k=DEFAULT_K, log=None):
+    """Recompute the neighbour table; returns a summary dict."""
+    started = time.monotonic()
+    colleges = list(db.colleges.find({}, FEATURE_PROJECTION))
+    ids = [college['_id'] for college in colleges]
+    fingerprints = [fingerprint(college, FEATURE_FIELDS) for college in colleges]
+    features = feature_matrix(colleges) if colleges else np.zeros((0, 0), dtype=np.float32)
+
+    stored = {} if full else {doc['_id']: doc for doc in db.similar_colleges.find({}, {'fingerprint': 1, 'neighbours': 1, 'scores': 1})}
+    if full:
+        todo = list(range(len(ids)))
+        deleted = set()
+    else:
+        changed_rows = [row for row, (college_id, fp) in enumerate(zip(ids, fingerprints))
+                        if stored.get(college_id, {}).get('fingerprint') != fp]
+        deleted = set(stored) - set(ids)
+        todo = _affected_rows(ids, features, stored, changed_rows, deleted, k)
+
+    now = datetime.now(timezone.utc)
+    ops = []
+    written = 0
+    for row, neighbours, scores in top_k_neighbours(features, todo, k):
+        ops.append(ReplaceOne({'_id': ids[row]}, {
+            '_id': ids[row],
+            'neighbours': [ids[n] for n in neighbours],
+            'scores': [round(float(s), 4) for s in scores],
+            'fingerprint': fingerprints[row],
+            'computed_at': now,
+        }, upsert=True))
+        if len(ops) >= BLOCK_SIZE:
+            db.similar_colleges.bulk_write(ops, ordered=False)
+            written += len(ops)
+            ops = []
+            if log:
+                log('%d/%d colleges' % (written, len(todo)))
+    if full:
+        ops.append(DeleteMany({'_id': {'$nin': ids}}))
+    elif deleted:
+        ops.append(DeleteMany({'_id': {'$in': list(deleted)}}))
+    if ops:
+        db.similar_colleges.bulk_write(ops, ordered=False)
+
+    return {
+        'colleges': len(ids),
+        'recomputed': len(todo),
+        'deleted': len(deleted),
+        'seconds': round(time.monotonic() - started, 3),
+    }
+
+
+class RebuildScheduler:
+    """Runs one delayed incremental build for any number of schedule() calls."""
+
+    def __init__(self, delay=-1):
+        self.delay = delay
+        self._pending = False
+        self._lock = threading.Lock()
+        self._build_lock = threading.Lock()
+
+    def schedule(self):
+        if self.delay < 0:
+            return  # disabled; rely on the worker
+        with self._lock:
+            if self._pending:
+                return
+            self._pending = True
+        timer = threading.Timer(self.delay, self._run)
+        timer.daemon = True
+        timer.start()
+
+    def _run(self):
+        with self._build_lock:  # never two builds at once in this process
+            with self._lock:
+                self._pending = False  # writes from here on need another run
+            try:
+                build(get_client().get_default_database())
+            except Exception:
+                log.exception('Incremental similar-colleges build failed')
+
+
+similar_rebuilds = RebuildScheduler(delay=Config.SIMILAR_REBUILD_DELAY)
+
+
+def similar_colleges(db, college_id, limit=DEFAULT_K):
+    """Stored neighbours of a college as summary documents, most similar first."""
+    stored = db.similar_colleges.find_one({'_id': college_id}, {'neighbours': 1, 'scores': 1})
+    if not stored:
+        return []
+    ids = stored['neighbours'][:limit]
+    by_id = {college['_id']: college for college in db.colleges.find({'_id': {'$in': ids}}, SUMMARY_PROJECTION)}
+    return [by_id[cid] for cid in ids if cid in by_id]
+
+
+def init_app(app):
+    @app.cli.command('build-similar')
+    @click.option('--full', is_flag=True, help='Recompute every college, not just affected ones.')
+    @click.option('--k', type=int, default=DEFAULT_K, show_default=True, help='Neighbours per college.')
+    def build_similar_command(full, k):
+        """Build the similar-colleges neighbour table."""
+        db = get_client().get_default_database()
+        click.echo(json.dumps(build(db, full=full, k=k, log=click.echo)))
+
+    @app.cli.command('similar-colleges-worker')
+    @click.option('--interval', type=int, default=600, help='Seconds between incremental runs.')
+    def worker_command(interval):
+        """Run incremental neighbour builds forever (for a process supervisor)."""
+        db = get_client().get_default_database()
+        while True:
+            click.echo(json.dumps(build(db, log=click.echo)))
+            time.sleep(interval)
@@ -0,0 +1,127 @@
+"""Admin dashboard statistics.
+
+Totals and aggregates are built by one aggregation per collection and then
+served from memory. The user/student/college totals are adjusted in place
+by the write paths. The aggregates (colleges per state, fee and rating
+histograms, student demand per course) are refreshed in a background thread
+once they are older than DASHBOARD_STATS_TTL. That way a dashboard load
+never waits on MongoDB except for the very first build in a process.
+"""
+import threading
+import time
+
+from config import Config
+from services.executor import query_executor
+
+FEE_BOUNDARIES = (0, 100000, 200000, 500000, 1000000, 2000000)
+TOP_COURSES = 15
+
+
+def _fee_label(lower):
+    if lower == 'more':
+        return '%dL+' % (FEE_BOUNDARIES[-1] // 100000)
+    upper = FEE_BOUNDARIES[FEE_BOUNDARIES.index(lower) + 1]
+    return '%g-%gL' % (lower / 100000, upper / 100000)
+
+
+def _college_aggregates(db):
+    return next(db.colleges.aggregate([{'$facet': {
+        'per_state': [
+            {'$match': {'state': {'$nin': [None, '']}}},
+            {'$group': {'_id': '$state', 'count': {'$sum': 1}}},
+            {'$sort': {'count': -1, '_id': 1}},
+        ],
+        'fees': [
+            {'$match': {'avg_fee': {'$type': 'number'}}},
+            {'$bucket': {'groupBy': '$avg_fee', 'boundaries': list(FEE_BOUNDARIES),
+                         'default': 'more', 'output': {'count': {'$sum': 1}}}},
+        ],
+        'ratings': [
+            {'$match': {'placement_rating': {'$type': 'number'}}},
+            {'$group': {'_id': {'$floor': '$placement_rating'}, 'count': {'$sum': 1}}},
+            {'$sort': {'_id': 1}},
+        ],
+    }}]), {})
+
+
+def _course_demand(db):
+    return list(db.students.aggregate([
+        {'$match': {'desired_course': {'$nin': [None, '']}}},
+        {'$group': {'_id': '$desired_course', 'count': {'$sum': 1}}},
+        {'$sort': {'count': -1, '_id': 1}},
+        {'$limit': TOP_COURSES},
+    ]))
+
+
+def compute_stats(db):
+    # Five independent queries; the slowest one sets the build time.
+    colleges, demand, user_count, student_count, college_count = query_executor.gather(
+        lambda: _college_aggregates(db),
+        lambda: _course_demand(db),
+        lambda: db.users.count_documents({}),
+        lambda: db.students.count_documents({}),
+        lambda: db.colleges.count_documents({}),
+    )
+    fees = {row['_id']: row['count'] for row in colleges.get('fees', [])}
+    return {
+        'user_count': user_count,
+        'student_count': student_count,
+        'college_count': college_count,
+        'colleges_per_state': [(row['_id'], row['count']) for row in colleges.get('per_state', [])],
+        'fee_histogram': [(_fee_label(lower), fees.get(lower, 0)) for lower in FEE_BOUNDARIES[:-1] + ('more',)],
+        'rating_histogram': [(int(row['_id']), row['count']) for row in colleges.get('ratings', [])],
+        'course_demand': [(row['_id'], row['count']) for row in demand],
+    }
+
+
+class DashboardStats:
+    def __init__(self, ttl=300):
+        self.ttl = ttl
+        self._stats = None
+        self._built_at = 0
+        self._refreshing = False
+        self._lock = threading.Lock()
+
+    def refresh(self, db):
+        stats = compute_stats(db)
+        with self._lock:
+            self._stats = stats
+            self._built_at = time.monotonic()
+            self._refreshing = False
+        return stats
+
+    def _refresh_in_background(self, db):
+        try:
+            self.refresh(db)
+        except Exception:
+            with self._lock:
+                self._refreshing = False  # retried on the next dashboard load
+            raise
+
+    def get(self, db):
+        """Current statistics; stale ones are returned while a refresh runs."""
+        stats = self._stats if self._stats is not None else self.refresh(db)
+        with self._lock:
+            # invalidate() may have reset _stats since; then serve our copy.
+            stats = dict(self._stats if self._stats is not None else stats)
+            built_at = self._built_at
+            stale = self.ttl and time.monotonic() - built_at > self.ttl
+            if stale and not self._refreshing:
+                self._refreshing = True
+                threading.Thread(target=self._refresh_in_background, args=(db,), daemon=True).start()
+        stats['age'] = int(time.monotonic() - built_at)
+        return stats
+
+    def incr(self, counter, delta=1):
+        """Adjust 'users', 'students' or 'colleges' after a write."""
+        with self._lock:
+            if self._stats is not None:
+                key = counter[:-1] + '_count'
+                self._stats[key] = max(0, self._stats[key] + delta)
+
+    def invalidate(self):
+        with self._lock:
+            self._stats = None
+
+
+dashboard_stats = DashboardStats(ttl=Config.DASHBOARD_STATS_TTL)
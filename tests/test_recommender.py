@@ -0,0 +1,131 @@
+"""Two-stage retrieval in CollegeSnapshot.top_k.
+
+The candidate path is only exact because no college outside the student's
+course/city postings can score more than BUDGET_SCORE + CUTOFF_SCORE. A
+change to any score weight or to the location rules that breaks that bound
+shows up here as a mismatch against ranking every row.
+"""
+import random
+
+import numpy as np
+import pytest
+
+from bench.synthetic import make_college, make_user_and_student
+from services.keys import college_keys, student_keys
+from services.recommender import BUDGET_SCORE, CUTOFF_SCORE, CollegeSnapshot
+
+N_COLLEGES = 5000
+N_PROFILES = 400
+# Many distinct courses keep the course postings selective enough for the
+# candidate path (the bench catalog's 20 courses would always fall back).
+COURSES = ['Course %d' % i for i in range(400)]
+
+
+@pytest.fixture(scope='module')
+def snapshot():
+    rng = random.Random(7)
+    colleges = []
+    for i in range(N_COLLEGES):
+        college = make_college(rng, i)
+        college['courses'] = rng.sample(COURSES, rng.randint(1, 5))
+        college.update(college_keys(college))
+        colleges.append(college)
+    return CollegeSnapshot(colleges)
+
+
+@pytest.fixture(scope='module')
+def profiles():
+    rng = random.Random(11)
+    profiles = []
+    for i in range(N_PROFILES):
+        _, student = make_user_and_student(rng, i)
+        student['desired_course'] = rng.choice(COURSES)
+        student.update(student_keys(student))
+        profiles.append(student)
+    return profiles
+
+
+def _top_k(snapshot, profile, k):
+    """top_k's rows and scores, and whether it fell back to scoring every row."""
+    full_scan = []
+    score = snapshot.score
+
+    def spy(profile, rows=None):
+        full_scan.append(rows is None)
+        return score(profile, rows)
+
+    snapshot.score = spy
+    try:
+        rows, scores = snapshot.top_k(profile, k)
+    finally:
+        del snapshot.score
+    return rows, scores, any(full_scan)
+
+
+def _full_scan(snapshot, profile, k):
+    return snapshot._rank(np.arange(snapshot.size), snapshot.score(profile), k)
+
+
+@pytest.mark.parametrize('k', [5, 20])
+def test_top_k_matches_full_scan(snapshot, profiles, k):
+    candidate_only = 0
+    for profile in profiles:
+        rows, scores, full_scan = _top_k(snapshot, profile, k)
+        candidate_only += not full_scan
+
+        expected_rows, expected_scores = _full_scan(snapshot, profile, k)
+        assert rows.tolist() == expected_rows.tolist()
+        assert scores.tolist() == expected_scores.tolist()
+
+    # The fast path has to be exercised for the comparison to mean anything.
+    assert candidate_only >= N_PROFILES // 4
+
+
+def test_candidates_hold_every_course_or_location_match(snapshot, profiles):
+    for profile in profiles:
+        candidates = set()
+        for posting in snapshot._candidate_postings(profile):
+            candidates.update(posting.tolist())
+        # Without budget and CGPA only course and location points are left.
+        matching = dict(profile, budget=None, academic_profile={})
+        scored = np.flatnonzero(snapshot.score(matching))
+        assert set(scored.tolist()) <= candidates
+
+
+def _catalog(fifth_has_course):
+    """Five Pune candidates among 400 far-away colleges that earn budget and cutoff points."""
+    colleges = [{'_id': i, 'college_name': 'Filler %d' % i, 'city': 'Srinagar', 'state': 'Jammu and Kashmir',
+                 'courses': ['Other'], 'avg_fee': 100000.0, 'cutoff': '5', 'placement_rating': 5.0}
+                for i in range(400)]
+    for i in range(5):
+        colleges.append({'_id': 400 + i, 'college_name': 'Candidate %d' % i, 'city': 'Pune',
+                         'state': 'Maharashtra', 'courses': ['Rare'], 'avg_fee': 100000.0, 'cutoff': '5',
+                         'placement_rating': 9.0})
+    if not fifth_has_course:
+        # Same city only, over budget and above the cutoff: LOCATION_SCORE alone.
+        colleges[-1].update(courses=['Other'], avg_fee=9000000.0, cutoff='9.9')
+    return CollegeSnapshot(colleges)
+
+
+STUDENT = {'desired_course': 'Rare', 'location_pref': 'Pune', 'budget': 500000.0,
+           'academic_profile': {'graduation_cgpa': '8'}}
+
+
+def test_candidates_beating_the_bound_skip_the_full_scan():
+    snapshot = _catalog(fifth_has_course=True)
+    rows, scores, full_scan = _top_k(snapshot, STUDENT, 5)
+    assert not full_scan
+    assert scores[-1] > BUDGET_SCORE + CUTOFF_SCORE
+    assert rows.tolist() == list(range(400, 405))
+
+
+def test_candidate_without_course_key_falls_back_to_full_scan():
+    snapshot = _catalog(fifth_has_course=False)
+    rows, scores, full_scan = _top_k(snapshot, STUDENT, 5)
+    # The fifth candidate's score does not beat what any filler earns.
+    assert full_scan
+    assert 404 not in rows.tolist()
+    expected_rows, expected_scores = _full_scan(snapshot, STUDENT, 5)
+    assert rows.tolist() == expected_rows.tolist()
+    assert scores.tolist() == expected_scores.tolist()
+    assert scores[-1] == BUDGET_SCORE + CUTOFF_SCORE
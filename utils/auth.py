@@ -1,5 +1,6 @@
 from functools import wraps
 from flask import session, redirect, url_for, flash
+from services.identity import current_user
 
 def login_required(f):
     @wraps(f)
@@ -7,6 +8,11 @@ def login_required(f):
         if not session.get('user_id'):
             flash('Please log in first.', 'warning')
             return redirect(url_for('auth.login'))
+        # Loads the user once per request; handlers reuse it via current_user()
+        if current_user() is None:
+            session.clear()
+            flash('User not found. Please login again.', 'danger')
+            return redirect(url_for('auth.login'))
         return f(*args, **kwargs)
     return wrapper
 